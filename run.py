@@ -9,12 +9,15 @@ from sudoku_solver.utils import print_board
 
 # Get user preferences for running code (i.e., decide what methods to use and not if user wants to customize and not use techniques recommended)
 def get_user_preferences():
-    print("\nBy default, all solving techniques are enabled for optimal performance.")
+    print("\nBy default, every solving technique is enabled except the pair and pointing/claiming rules,")
+    print("which only pay for their cost on the hardest puzzles.")
     print("Would you like to customize which techniques to use?")
-    customize = input("Enter 'y' for custom configuration, any other key for all techniques: ").lower()
+    customize = input("Enter 'y' for custom configuration, any other key for the defaults: ").lower()
     
     if customize != 'y':
-        return {'use_mrv': True, 'use_forward_checking': True, 'use_ac3': True, 'use_lcv': True}
+        return {'use_mrv': True, 'use_forward_checking': True, 'use_ac3': True, 'use_lcv': True,
+                'use_naked_singles': True, 'use_hidden_singles': True, 'use_naked_pairs': False,
+                'use_hidden_pairs': False, 'use_locked_candidates': False}
     
     print("\nFor each technique, press Enter to enable or 'n' to disable:")
     
@@ -30,7 +33,12 @@ def get_user_preferences():
     lcv = input("\nUse LCV (Least Constraining Value)? \n"
                 "This helps choose which number to try first by selecting the one that restricts neighbors least [Y/n]: ").lower() != 'n'
     
-    return {'use_mrv': mrv, 'use_forward_checking': fc, 'use_ac3': ac3, 'use_lcv': lcv}
+    rules = input("\nUse unit inference rules (naked/hidden singles, naked/hidden pairs, pointing/claiming)? \n"
+                  "These look at whole rows, columns and boxes to rule out values pairwise checks can't see [Y/n]: ").lower() != 'n'
+    
+    return {'use_mrv': mrv, 'use_forward_checking': fc, 'use_ac3': ac3, 'use_lcv': lcv,
+            'use_naked_singles': rules, 'use_hidden_singles': rules, 'use_naked_pairs': rules,
+            'use_hidden_pairs': rules, 'use_locked_candidates': rules}
 
 # MAIN program function: provides introduction and faciliates user interface/options
 def main():
@@ -47,6 +55,7 @@ def main():
     print("- Forward Checking: Immediately updates affected cells after each assignment")
     print("- AC-3 (Arc Consistency): Propagates constraints to reduce invalid choices")
     print("- LCV (Least Constraining Value): Tries values that restrict neighbors least")
+    print("- Inference Rules: Naked/hidden singles, naked/hidden pairs and pointing/claiming on whole units")
 
     # get solving preferences (i.e., can turn off algorithmic enhancements like MRV, etc.)
     preferences = get_user_preferences()
@@ -75,7 +84,7 @@ def main():
         print(f"- {technique[4:].upper()}: {'Enabled' if enabled else 'Disabled'}")
     
     # solve the puzzle
-    solver = SudokuSolver(puzzle, **preferences)
+    solver = SudokuSolver(puzzle, collect_stats=True, **preferences)
     start_time = time.time()
     success = solver.solve()
     solve_time = time.time() - start_time
@@ -90,5 +99,15 @@ def main():
         print("\nNo solution found!")
         print(f"Time spent attempting to solve: {solve_time:.4f} seconds")
 
+    # search statistics: how much work each technique did
+    stats = solver.stats
+    print("\nSearch statistics:")
+    print(f"- Nodes expanded: {stats.nodes} (max depth {stats.max_depth}), backtracks: {stats.backtracks}")
+    print(f"- Forward-check wipeouts: {stats.fc_wipeouts}, AC-3 arcs processed: {stats.ac3_arcs}")
+    for technique, count in stats.pruned.most_common():
+        print(f"- Values pruned by {technique}: {count}")
+    for phase, seconds in stats.times.items():
+        print(f"- Time in {phase}: {seconds:.4f} seconds")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
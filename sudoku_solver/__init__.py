@@ -1,3 +1,12 @@
-from .solver import SudokuSolver
+from .solver import SudokuSolver, SOLVED, UNSOLVABLE, INVALID, TIMEOUT, BUDGET_EXCEEDED
+from .dlx import DLXSolver
+from .batch import solve_many, solve_many_parallel, solve_corpus, SolveResult
+from .aio import solve_async
+from .cache import SolutionCache, DiskCache
+from .portfolio import solve_portfolio
+from .parallel import solve_parallel, count_solutions_parallel, has_unique_solution_parallel
 
-__all__ = ['SudokuSolver']
\ No newline at end of file
+__all__ = ['SudokuSolver', 'DLXSolver', 'solve_many', 'solve_many_parallel', 'solve_corpus', 'SolveResult',
+           'solve_async', 'SolutionCache', 'DiskCache', 'solve_portfolio',
+           'solve_parallel', 'count_solutions_parallel', 'has_unique_solution_parallel',
+           'SOLVED', 'UNSOLVABLE', 'INVALID', 'TIMEOUT', 'BUDGET_EXCEEDED']
\ No newline at end of file
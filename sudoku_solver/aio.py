@@ -0,0 +1,77 @@
+#
+# asyncio front end for the CSP solver
+#   the search runs cooperatively on the event loop: it is resumable, so it runs for a short time slice, hands control
+#   back to the loop, and picks up where it left off; many puzzles can be solved concurrently without blocking other tasks
+#   slices are measured in time rather than nodes, since a node costs ~20us with forward checking alone but several
+#   milliseconds with every inference rule on
+#   (no threads or processes: the solver is pure python, so a thread pool would still share one core and the GIL)
+#
+
+import asyncio
+import time
+from .solver import SudokuSolver, SOLVED, UNSOLVABLE, INVALID
+from .budget import Budget
+from .cache import canonical_key, encode_solution, UNSOLVABLE_ENTRY
+from .batch import SolveResult
+from .utils import copy_board, is_valid_board
+
+
+# solves a copy of board without blocking the event loop; returns a SolveResult like the batch API
+#   slice_seconds = how long the search runs before yielding to the event loop (checked after every node; root
+#   propagation runs in one go)
+#   max_nodes / max_seconds / max_memory = budgets as for SudokuSolver.solve (TIMEOUT / BUDGET_EXCEEDED results);
+#   max_seconds counts wall-clock time, including the time other tasks run in between
+#   other options go to SudokuSolver (e.g. collect_stats=True adds stats['search'], cache=SolutionCache() is looked
+#   up before searching, like in solve)
+#   cancelling the task (asyncio.CancelledError) stops the search at the next yield
+async def solve_async(board, slice_seconds=0.005, max_nodes=None, max_seconds=None, max_memory=None, **options):
+    if not is_valid_board(board):
+        return SolveResult(None, INVALID, {'time': 0.0})
+
+    start_time = time.time()
+    budget = Budget(max_nodes, max_seconds, max_memory)
+    solution = copy_board(board)
+    solver = SudokuSolver(solution, **options)
+    if solver.cache is None:
+        result = await search_cooperatively(solver, budget, slice_seconds)
+    else:
+        key, transform = canonical_key(solution)
+        entry = solver.cache.get(key)
+        if entry is not None:
+            result = solver.load_cached(entry, transform)
+        else:
+            result = await search_cooperatively(solver, budget, slice_seconds)
+            if result is not None:
+                solver.cache.put(key, encode_solution(solution, transform) if result else UNSOLVABLE_ENTRY)
+
+    stats = {'time': time.time() - start_time}
+    if solver.stats is not None:
+        stats['search'] = solver.stats.as_dict()
+    if result:
+        return SolveResult(solution, SOLVED, stats)
+    if result is None:  # out of budget
+        return SolveResult(None, solver.status, stats)
+    return SolveResult(None, UNSOLVABLE, stats)
+
+
+# runs a solver's search on the event loop, slice_seconds at a time; returns like SudokuSolver.solve
+async def search_cooperatively(solver, budget, slice_seconds):
+    clock = time.perf_counter
+    try:
+        await asyncio.sleep(0)
+        if not solver.start_search_within(budget): return False
+        result = None
+        while result is None:
+            await asyncio.sleep(0)
+            slice_end = clock() + slice_seconds
+            while result is None and clock() < slice_end:
+                size = budget.next_slice(1)
+                if size == 0: break  # node budget used up
+                result = solver.run_search(size)
+                if result is None: budget.spend(size)
+            # the budget (time, memory) is checked once per slice
+            if result is None and solver.out_of_budget(budget): return None
+        return result
+    except asyncio.CancelledError:
+        solver.cancel_search()
+        raise
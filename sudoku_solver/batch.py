@@ -0,0 +1,170 @@
+#
+# Batch solving: runs many puzzles through one solver instance
+#   the geometry tables are shared by every solver anyway; on top of that a single solver is reset for each puzzle,
+#   so its domain store, trails and flat grid get reused instead of rebuilt (or the DLX matrix, for engine='dlx')
+#
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import itertools
+import os
+import time
+from .solver import SudokuSolver, SOLVED, UNSOLVABLE, INVALID
+from .budget import BUDGET_OPTIONS
+from .dlx import DLXSolver
+from .utils import copy_board, is_valid_board, pack_board, unpack_board
+from .puzzles.corpus import Corpus
+
+# one batch result: solution = solved board (None if not solved), status = SOLVED/UNSOLVABLE/INVALID (or TIMEOUT/
+#   BUDGET_EXCEEDED when a budget is set),
+#   stats = dict of measurements for the solve: 'time' (in seconds), plus 'search' (SearchStats.as_dict()) when the CSP
+#   engine runs with collect_stats=True
+SolveResult = namedtuple('SolveResult', ['solution', 'status', 'stats'])
+
+# solving engines selectable by name
+ENGINES = {'csp': SudokuSolver, 'dlx': DLXSolver}
+
+
+# keeps one solver alive across puzzles and resets it for each new board (lazily created on the first valid board)
+#   budget options (max_nodes, max_seconds, max_memory) are applied to every solve instead of going to the solver;
+#   a puzzle that runs out of budget gets a TIMEOUT or BUDGET_EXCEEDED result (CSP engine only)
+class BatchRunner:
+    def __init__(self, engine='csp', **options):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine}")
+        self.budget = {key: options.pop(key) for key in BUDGET_OPTIONS if key in options}
+        if self.budget and engine != 'csp':
+            raise ValueError(f"Budgets are not supported by the {engine} engine")
+        self.engine = engine
+        self.options = options
+        self.solver = None
+
+    # solves a copy of puzzle and returns its SolveResult (the puzzle itself is not modified)
+    def solve(self, puzzle):
+        if not is_valid_board(puzzle):
+            return SolveResult(None, INVALID, {'time': 0.0})
+
+        board = copy_board(puzzle)
+        start_time = time.time()
+        if self.solver is None or len(board) != self.solver.size:  # (a new solver for each change of board size)
+            self.solver = ENGINES[self.engine](board, **self.options)
+        else:
+            self.solver.reset(board)
+        success = self.solver.solve(**self.budget)
+        stats = {'time': time.time() - start_time}
+        if getattr(self.solver, 'stats', None) is not None:
+            stats['search'] = self.solver.stats.as_dict()
+
+        if success:
+            return SolveResult(board, SOLVED, stats)
+        if success is None:  # out of budget
+            return SolveResult(None, self.solver.status, stats)
+        return SolveResult(None, UNSOLVABLE, stats)
+
+
+# solves every board in puzzles (any iterable, consumed lazily) and yields a SolveResult per board, in input order
+#   options are passed on to the solver (e.g. use_lcv=False or domain_backend='set' for the CSP engine)
+#   input boards are not modified; invalid boards give an INVALID result instead of stopping the batch
+def solve_many(puzzles, engine='csp', **options):
+    runner = BatchRunner(engine, **options)
+    for puzzle in puzzles:
+        yield runner.solve(puzzle)
+
+
+#
+# Process-pool batch solving: the solver is pure python and CPU-bound, so threads don't help
+#   puzzles are sent to the workers in chunks of packed 81-byte strings (not nested lists) to keep pickling cheap,
+#   or read by the workers straight from a memory-mapped corpus file, and each worker process keeps one BatchRunner
+#   for its whole life
+#
+
+# the BatchRunner of the current worker process (set up by the pool initializer)
+_worker_runner = None
+
+
+def _init_worker(engine, options):
+    global _worker_runner
+    _worker_runner = BatchRunner(engine, **options)
+
+
+# solves one chunk of (index, packed board or None for invalid input) in a worker
+#   returns (index, packed solution or None, status, stats) for each puzzle
+def _solve_chunk(chunk):
+    results = []
+    for index, packed in chunk:
+        if packed is None:
+            results.append((index, None, INVALID, {'time': 0.0}))
+            continue
+        result = _worker_runner.solve(unpack_board(packed))
+        solution = pack_board(result.solution) if result.solution is not None else None
+        results.append((index, solution, result.status, result.stats))
+    return results
+
+
+# splits puzzles into lists of (index, packed board) of up to chunk_size puzzles, reading the input lazily
+def _packed_chunks(puzzles, chunk_size):
+    chunk = []
+    for index, puzzle in enumerate(puzzles):
+        chunk.append((index, pack_board(puzzle) if is_valid_board(puzzle) else None))
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# parallel version of solve_many, spread over a pool of worker processes (workers=None -> one per CPU)
+#   ordered=True yields SolveResults in input order; ordered=False yields (index, SolveResult) pairs as soon as
+#   they complete, where index is the puzzle's position in the input
+#   only a few chunks per worker are in flight at a time, so arbitrarily long input streams run in bounded memory
+def solve_many_parallel(puzzles, workers=None, chunk_size=64, ordered=True, engine='csp', **options):
+    tasks = ((_solve_chunk, chunk) for chunk in _packed_chunks(puzzles, chunk_size))
+    return _run_pool(tasks, workers, ordered, engine, options)
+
+
+# solves records start..stop-1 of a packed corpus file (see puzzles/corpus.py) over a pool of worker processes
+#   workers are only sent record ranges: each one maps the corpus file itself and reads its puzzles directly,
+#   so nothing is parsed or pickled on the way in; results work like solve_many_parallel (index = record number)
+def solve_corpus(path, start=0, stop=None, workers=None, chunk_size=64, ordered=True, engine='csp', **options):
+    with Corpus(path) as corpus:
+        stop = len(corpus) if stop is None else min(stop, len(corpus))
+    tasks = ((_solve_range, (path, first, min(first + chunk_size, stop))) for first in range(start, stop, chunk_size))
+    return _run_pool(tasks, workers, ordered, engine, options)
+
+
+# corpora opened by the current worker process, by path (kept open so the mapping is reused across chunks)
+_worker_corpora = {}
+
+
+# solves records start..stop-1 of a corpus in a worker; same return format as _solve_chunk
+def _solve_range(task):
+    path, start, stop = task
+    corpus = _worker_corpora.get(path)
+    if corpus is None:
+        corpus = _worker_corpora[path] = Corpus(path)
+    return _solve_chunk([(index, corpus.packed(index)) for index in range(start, stop)])
+
+
+# runs (worker function, argument) tasks on a process pool and yields their results (see solve_many_parallel)
+def _run_pool(tasks, workers, ordered, engine, options):
+    BatchRunner(engine, **options)  # checks the engine and budget options before any worker starts
+    workers = workers or os.cpu_count() or 1
+    max_pending = 2 * workers
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(engine, options)) as pool:
+        pending = [pool.submit(*task) for task in itertools.islice(tasks, max_pending)]
+        while pending:
+            if ordered:
+                done = [pending.pop(0)]
+            else:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                done = [future for future in pending if future in finished]
+                pending = [future for future in pending if future not in finished]
+
+            # keep the pool busy: one new chunk for every finished one
+            pending.extend(pool.submit(*task) for task in itertools.islice(tasks, len(done)))
+
+            for future in done:
+                for index, solution, status, stats in future.result():
+                    result = SolveResult(unpack_board(solution) if solution is not None else None, status, stats)
+                    yield result if ordered else (index, result)
@@ -0,0 +1,225 @@
+#
+# Benchmark suite: runs every combination of SudokuSolver's technique flags over one or more puzzle corpora
+#   python -m sudoku_solver.bench [corpus ...] [--flags ...] [--trials N] [--warmup N] [--json PATH] [--csv PATH]
+#   a corpus is 'easy' or 'hard' (the bundled puzzles), a one-puzzle-per-line text file (may be gzip/bz2 compressed),
+#   or a packed binary corpus written by puzzles.corpus.write_corpus
+#   for each combination and corpus: one untimed pass with collect_stats on (node counts, and it doubles as warmup),
+#   more untimed warmup passes, then the timed trials; every solve in a trial is one time sample
+#   results always come out in the same order (corpus, backend, combination), so the JSON/CSV files of two commits
+#   can be diffed directly
+#
+
+import argparse
+import csv
+import itertools
+import json
+import platform
+import sys
+import time
+from .solver import SudokuSolver
+from .utils import copy_board, is_valid_board
+from .puzzles import get_easy_puzzle, get_hard_puzzle, iter_puzzles
+from .puzzles.corpus import MAGIC, Corpus
+
+# flags that can be varied, by name: each turns one or more SudokuSolver options on or off together
+#   'rules' switches all five inference rules at once (like the interactive run.py)
+FLAGS = {
+    'mrv': ('use_mrv',),
+    'forward_checking': ('use_forward_checking',),
+    'ac3': ('use_ac3',),
+    'incremental_ac3': ('use_incremental_ac3',),
+    'lcv': ('use_lcv',),
+    'naked_singles': ('use_naked_singles',),
+    'hidden_singles': ('use_hidden_singles',),
+    'naked_pairs': ('use_naked_pairs',),
+    'hidden_pairs': ('use_hidden_pairs',),
+    'locked_candidates': ('use_locked_candidates',),
+    'nogoods': ('use_nogoods',),
+    'rules': ('use_naked_singles', 'use_hidden_singles', 'use_naked_pairs', 'use_hidden_pairs',
+              'use_locked_candidates'),
+}
+
+# flags varied by default: the techniques run.py lets you turn off (32 combinations)
+DEFAULT_FLAGS = ('mrv', 'forward_checking', 'ac3', 'lcv', 'rules')
+
+# every single solver flag ('--flags all', 2048 combinations)
+ALL_FLAGS = ('mrv', 'forward_checking', 'ac3', 'incremental_ac3', 'lcv', 'naked_singles', 'hidden_singles',
+             'naked_pairs', 'hidden_pairs', 'locked_candidates', 'nogoods')
+
+# columns of the CSV output (and keys of every JSON result)
+FIELDS = ('corpus', 'combination', 'backend', 'puzzles', 'solved', 'unsolvable', 'over_budget', 'samples',
+          'median_s', 'p95_s', 'mean_s', 'nodes_total', 'nodes_median', 'nodes_max', 'backtracks_total')
+
+
+# loads a corpus by name or path into a list of boards (at most limit of them); invalid boards are skipped
+def load_corpus(spec, limit=None):
+    if spec == 'easy':
+        boards = [get_easy_puzzle()]
+    elif spec == 'hard':
+        boards = [get_hard_puzzle()]
+    else:
+        with open(spec, 'rb') as file:
+            binary = file.read(len(MAGIC)) == MAGIC
+        if binary:
+            with Corpus(spec) as corpus:
+                boards = list(corpus.boards(0, limit))
+        else:
+            boards = list(itertools.islice(iter_puzzles(spec), limit))
+    valid = [board for board in boards[:limit] if is_valid_board(board)]
+    skipped = len(boards[:limit]) - len(valid)
+    if skipped:
+        print(f"{spec}: skipped {skipped} invalid boards", file=sys.stderr)
+    return valid
+
+
+# every on/off combination of the named flags, as (label, solver options) pairs
+#   flags that aren't varied keep the solver defaults; the label lists the varied flags that are on ('none' if none)
+def flag_combinations(names):
+    combinations = []
+    for states in itertools.product((True, False), repeat=len(names)):
+        options = {}
+        for name, state in zip(names, states):
+            for option in FLAGS[name]:
+                options[option] = state
+        label = '+'.join(name for name, state in zip(names, states) if state) or 'none'
+        combinations.append((label, options))
+    return combinations
+
+
+# nearest-rank percentile (q in 0-100) of a list of numbers
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered: return None
+    rank = max(1, -(-len(ordered) * q // 100))  # ceil(n * q / 100)
+    return ordered[int(rank) - 1]
+
+
+# solves one board with a solver (reset onto a copy of it); returns TRUE (solved), FALSE (no solution)
+#   or None (gave up after max_nodes nodes, counting the root like solve does)
+def run_one(solver, puzzle, max_nodes):
+    solver.reset(copy_board(puzzle))
+    if not solver.start_search(): return False
+    return solver.run_search(max_nodes - len(solver.stack) if max_nodes is not None else None)
+
+
+# benchmarks one combination of solver options on one corpus; returns a result dict (keys = FIELDS)
+def bench_combination(puzzles, options, trials, warmup, max_nodes):
+    # untimed pass with stats on: node counts and outcomes (the search is deterministic, so every trial does the same)
+    counter = SudokuSolver(copy_board(puzzles[0]), collect_stats=True, **options)
+    outcomes, nodes, backtracks = [], [], 0
+    for puzzle in puzzles:
+        outcomes.append(run_one(counter, puzzle, max_nodes))
+        nodes.append(counter.stats.nodes)
+        backtracks += counter.stats.backtracks
+
+    solver = SudokuSolver(copy_board(puzzles[0]), **options)
+    for _ in range(warmup):
+        for puzzle in puzzles:
+            run_one(solver, puzzle, max_nodes)
+
+    samples = []
+    for _ in range(trials):
+        for puzzle in puzzles:
+            start_time = time.perf_counter()
+            run_one(solver, puzzle, max_nodes)
+            samples.append(time.perf_counter() - start_time)
+
+    return {
+        'puzzles': len(puzzles),
+        'solved': outcomes.count(True),
+        'unsolvable': outcomes.count(False),
+        'over_budget': outcomes.count(None),
+        'samples': len(samples),
+        'median_s': percentile(samples, 50),
+        'p95_s': percentile(samples, 95),
+        'mean_s': sum(samples) / len(samples) if samples else None,
+        'nodes_total': sum(nodes),
+        'nodes_median': percentile(nodes, 50),
+        'nodes_max': max(nodes),
+        'backtracks_total': backtracks,
+    }
+
+
+# runs the whole benchmark and returns the list of result dicts (keys = FIELDS)
+#   corpora = {name: list of boards}; progress lines go to out (None = silent)
+def run_benchmark(corpora, flags=DEFAULT_FLAGS, backends=('bitmask',), trials=5, warmup=1, max_nodes=20000,
+                  out=None):
+    results = []
+    for corpus_name, puzzles in corpora.items():
+        if not puzzles: continue
+        for backend in backends:
+            for label, options in flag_combinations(flags):
+                result = {'corpus': corpus_name, 'combination': label, 'backend': backend}
+                result.update(bench_combination(puzzles, dict(options, domain_backend=backend), trials, warmup,
+                                                max_nodes))
+                results.append(result)
+                if out is not None:
+                    print(format_result(result), file=out, flush=True)
+    return results
+
+
+# one line of the text report
+def format_result(result):
+    budget = f" ({result['over_budget']} over budget)" if result['over_budget'] else ''
+    return (f"{result['corpus']:<12} {result['backend']:<8} {result['combination']:<40} "
+            f"median {result['median_s'] * 1000:9.3f} ms  p95 {result['p95_s'] * 1000:9.3f} ms  "
+            f"nodes {result['nodes_total']:>8}{budget}")
+
+
+# writes results as JSON (with the run settings and platform, to tell runs apart) and/or CSV
+def write_results(results, settings, json_path=None, csv_path=None):
+    if json_path:
+        meta = {'python': platform.python_version(), 'implementation': platform.python_implementation(),
+                'machine': platform.machine(), 'settings': settings}
+        with open(json_path, 'w') as file:
+            json.dump({'meta': meta, 'results': results}, file, indent=2)
+            file.write('\n')
+    if csv_path:
+        with open(csv_path, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
+
+
+# parses a comma-separated list of flag names ('all' = every single flag)
+def parse_flags(text):
+    if text == 'all':
+        return ALL_FLAGS
+    names = tuple(name.strip() for name in text.split(',') if name.strip())
+    for name in names:
+        if name not in FLAGS:
+            raise argparse.ArgumentTypeError(f"unknown flag {name!r} (choose from {', '.join(FLAGS)}, or 'all')")
+    return names
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m sudoku_solver.bench',
+                                     description="Benchmark SudokuSolver technique combinations over puzzle corpora")
+    parser.add_argument('corpora', nargs='*', default=['easy', 'hard'],
+                        help="'easy', 'hard', a one-puzzle-per-line file or a packed corpus (default: easy hard)")
+    parser.add_argument('--flags', type=parse_flags, default=DEFAULT_FLAGS,
+                        help=f"comma-separated flags to vary (default: {','.join(DEFAULT_FLAGS)}; 'all' = every flag)")
+    parser.add_argument('--backends', default='bitmask', help="comma-separated domain backends (default: bitmask)")
+    parser.add_argument('--trials', type=int, default=5, help="timed passes over each corpus (default: 5)")
+    parser.add_argument('--warmup', type=int, default=1, help="untimed passes before the trials (default: 1)")
+    parser.add_argument('--limit', type=int, default=None, help="use at most this many puzzles per corpus")
+    parser.add_argument('--max-nodes', type=int, default=20000,
+                        help="give up on a puzzle after this many search nodes (default: 20000)")
+    parser.add_argument('--json', dest='json_path', help="write results to this JSON file")
+    parser.add_argument('--csv', dest='csv_path', help="write results to this CSV file")
+    parser.add_argument('--quiet', action='store_true', help="don't print a line per result")
+    args = parser.parse_args(argv)
+    if args.trials < 1:
+        parser.error("--trials must be at least 1")
+
+    corpora = {spec: load_corpus(spec, args.limit) for spec in args.corpora}
+    backends = tuple(name.strip() for name in args.backends.split(','))
+    settings = {'corpora': args.corpora, 'flags': list(args.flags), 'backends': list(backends),
+                'trials': args.trials, 'warmup': args.warmup, 'limit': args.limit, 'max_nodes': args.max_nodes}
+    results = run_benchmark(corpora, args.flags, backends, args.trials, args.warmup, args.max_nodes,
+                            out=None if args.quiet else sys.stdout)
+    write_results(results, settings, args.json_path, args.csv_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#
+# Resource budgets for a single solve: node count, wall-clock time and memory
+#   the solver runs its (resumable) search in short slices of nodes and checks the budget in between, so the
+#   clock and the memory reading are only looked at every CHECK_INTERVAL nodes instead of at every node
+#
+
+import mmap
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# budget keyword arguments accepted by SudokuSolver.solve (and passed through by the batch API)
+BUDGET_OPTIONS = ('max_nodes', 'max_seconds', 'max_memory')
+
+# search nodes between two time/memory checks
+CHECK_INTERVAL = 32
+
+
+# memory used by the current process in bytes: resident set size from /proc on Linux, otherwise the peak resident
+#   size reported by getrusage (None if neither is available, in which case memory budgets aren't enforced)
+def memory_in_use():
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * mmap.PAGESIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024  # bytes on macOS, kilobytes elsewhere
+    return None
+
+
+# limits for one solve (None = no limit): max_nodes search nodes, max_seconds of wall-clock time from creation,
+#   max_memory bytes of process memory (the whole process, since that is what a worker runs out of)
+class Budget:
+    def __init__(self, max_nodes=None, max_seconds=None, max_memory=None):
+        self.max_nodes = max_nodes
+        self.max_memory = max_memory
+        self.deadline = time.perf_counter() + max_seconds if max_seconds is not None else None
+        self.nodes = 0  # nodes used so far
+
+    # number of nodes to run before the next check (None = no need to stop before the end)
+    #   cap = largest slice the caller wants anyway (e.g. to yield to an event loop every few nodes)
+    def next_slice(self, cap=None):
+        size = CHECK_INTERVAL if self.deadline is not None or self.max_memory is not None else None
+        if cap is not None:
+            size = cap if size is None else min(size, cap)
+        if self.max_nodes is not None:
+            remaining = max(self.max_nodes - self.nodes, 0)
+            size = remaining if size is None else min(size, remaining)
+        return size
+
+    # records a slice that used up all of its nodes
+    def spend(self, nodes):
+        self.nodes += nodes
+
+    # which limit has run out: 'nodes', 'seconds', 'memory' or None if the solve can go on
+    def exceeded(self):
+        if self.max_nodes is not None and self.nodes >= self.max_nodes:
+            return 'nodes'
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            return 'seconds'
+        if self.max_memory is not None:
+            memory = memory_in_use()
+            if memory is not None and memory > self.max_memory:
+                return 'memory'
+        return None
@@ -0,0 +1,197 @@
+#
+# Solution cache in front of SudokuSolver.solve
+#   puzzles are stored under their canonical form (see symmetry.py), so a relabeled, transposed or row/column-permuted
+#   copy of a puzzle already solved is a cache hit: the cached canonical solution is mapped back onto the new puzzle
+#   entries: key = canonical puzzle packed into 81 bytes, value = canonical solution packed the same way, or b'' for a
+#   puzzle with no solution
+#   SolutionCache keeps entries in memory; DiskCache keeps them in a sqlite file shared by every process that opens it,
+#   and can sit behind a SolutionCache as its backing store
+#
+
+from collections import OrderedDict
+import hashlib
+import os
+import sqlite3
+import time
+from .symmetry import canonical_form
+from .utils import unpack_board
+
+# cached value of a puzzle with no solution
+UNSOLVABLE_ENTRY = b''
+
+
+# cache key of a board and the transform that maps it onto its canonical form
+def canonical_key(board):
+    canonical, transform = canonical_form(board)
+    return bytes(canonical), transform
+
+
+# packs a solution of board (solved in the original frame) into its cached, canonical form
+def encode_solution(solution, transform):
+    return bytes(value for row in transform.apply(solution) for value in row)
+
+
+# unpacks a cached solution back onto the frame of the board it was looked up for
+def decode_solution(entry, transform):
+    return transform.invert(unpack_board(entry))
+
+
+# in-process least-recently-used cache holding up to maxsize puzzles
+#   pass it to SudokuSolver(board, cache=...) (one cache can be shared by any number of solvers)
+#   backing = optional slower cache (e.g. a DiskCache): read on a miss, and written through on every put
+class SolutionCache:
+    def __init__(self, maxsize=4096, backing=None):
+        self.maxsize = maxsize
+        self.backing = backing
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    # cached value for key (None if it isn't cached); a hit makes the entry the most recently used
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            if self.backing is not None:
+                entry = self.backing.get(key)
+                if entry is not None:
+                    self.remember(key, entry)
+            return entry
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    # stores a value (and writes it through to the backing cache)
+    def put(self, key, entry):
+        self.remember(key, entry)
+        if self.backing is not None:
+            self.backing.put(key, entry)
+
+    # stores a value in memory only, evicting the least recently used entries beyond maxsize
+    def remember(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# how often (in puts) a DiskCache checks its size and evicts
+EVICT_EVERY = 256
+
+# a DiskCache hit only rewrites the entry's last-used time if it is older than this (in seconds), so that readers
+#   rarely need the write lock
+TOUCH_INTERVAL = 60.0
+
+
+# connections a forked process inherited from its parent (never used or closed, see DiskCache.connection)
+_inherited_connections = []
+
+
+# persistent cache in a sqlite database, with the same get/put interface as SolutionCache
+#   path = database file, or a directory to keep 'solutions.sqlite' in
+#   rows are keyed by a 16-byte BLAKE2 digest of the packed canonical puzzle (the puzzle is stored too and checked on
+#   lookup); the database runs in WAL mode, so any number of processes can read it while one writes
+#   max_entries bounds its size: the least recently used rows beyond it are deleted every EVICT_EVERY puts
+#   every process (and every pool worker the cache is sent to) opens its own connection on first use
+class DiskCache:
+    def __init__(self, path, max_entries=1000000, timeout=10.0):
+        if os.path.isdir(path):
+            path = os.path.join(path, 'solutions.sqlite')
+        self.path = path
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.puts = 0
+        self.db = None
+        self.pid = None
+        self.connection()  # creates the database right away, so a bad path fails here
+
+    # the connection of the current process, opened (and the table created) on first use
+    def connection(self):
+        if self.db is None or self.pid != os.getpid():
+            if self.db is not None:
+                # inherited through fork: closing it here could release the parent's file locks, so it's just kept
+                _inherited_connections.append(self.db)
+            self.db = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            self.pid = os.getpid()
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute("CREATE TABLE IF NOT EXISTS solutions (digest BLOB PRIMARY KEY, puzzle BLOB NOT NULL, "
+                            "solution BLOB NOT NULL, last_used REAL NOT NULL) WITHOUT ROWID")
+        return self.db
+
+    # connections can't be pickled (or shared with a forked process): a copy opens its own
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['db'] = None
+        return state
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.db is not None and self.pid == os.getpid():
+            self.db.close()
+        self.db = None
+
+    def __len__(self):
+        return self.connection().execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+
+    def __contains__(self, key):
+        row = self.connection().execute("SELECT puzzle FROM solutions WHERE digest = ?", (digest(key),)).fetchone()
+        return row is not None and row[0] == key
+
+    # cached value for key (None if it isn't cached)
+    def get(self, key):
+        db = self.connection()
+        row = db.execute("SELECT puzzle, solution, last_used FROM solutions WHERE digest = ?",
+                         (digest(key),)).fetchone()
+        if row is None or row[0] != key:
+            self.misses += 1
+            return None
+        self.hits += 1
+        now = time.time()
+        if now - row[2] > TOUCH_INTERVAL:
+            db.execute("UPDATE solutions SET last_used = ? WHERE digest = ?", (now, digest(key)))
+        return row[1]
+
+    # stores a value (replacing any previous one for the key)
+    def put(self, key, entry):
+        db = self.connection()
+        db.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?)", (digest(key), key, entry, time.time()))
+        self.puts += 1
+        if self.puts % EVICT_EVERY == 0:
+            self.evict()
+
+    # deletes the least recently used rows beyond max_entries
+    def evict(self):
+        db = self.connection()
+        excess = len(self) - self.max_entries
+        if excess > 0:
+            db.execute("DELETE FROM solutions WHERE digest IN "
+                       "(SELECT digest FROM solutions ORDER BY last_used LIMIT ?)", (excess,))
+
+    def clear(self):
+        self.connection().execute("DELETE FROM solutions")
+        self.hits = 0
+        self.misses = 0
+
+
+# database key of a cache key (packed canonical puzzle)
+def digest(key):
+    return hashlib.blake2b(key, digest_size=16).digest()
@@ -0,0 +1,200 @@
+#
+# Alternative solving engine: Knuth's Algorithm X with Dancing Links (DLX)
+#   the board is encoded as an exact-cover problem: every (cell, value) placement is a matrix row that covers 4 columns
+#   (cell filled, value in row, value in column, value in box) -> 729 rows x 324 constraint columns on a 9x9 board
+#   (size^3 rows x 4 * size^2 columns in general: any N^2 x N^2 board works, sized by the board it's created with)
+#   a solution is a set of rows covering every column exactly once
+#   the linked lists live in flat python lists indexed by node number (no per-node objects)
+#
+
+from .utils import is_valid_board, board_box_size
+from .geometry import get_geometry
+
+
+# exact-cover solver with the same interface as SudokuSolver: construct with a board, call solve()
+class DLXSolver:
+    def __init__(self, board):
+        if not is_valid_board(board):
+            raise ValueError("Invalid Sudoku board")
+        self.box_size = board_box_size(board)
+        self.size = self.box_size * self.box_size
+        self.empty = 0
+        self.geometry = get_geometry(self.box_size)
+
+        self.partial = []  # matrix rows picked on the current search path
+        self.given_columns = []  # columns covered by the givens, in the order they were covered
+        self.build_matrix()
+        self.reset(board)
+
+    # loads a board into the solver, reusing the matrix: the previous board's givens are uncovered (newest first)
+    #   and the new ones covered, instead of building the links again
+    def reset(self, board):
+        if not is_valid_board(board):
+            raise ValueError("Invalid Sudoku board")
+        if len(board) != self.size:
+            raise ValueError(f"Board is {len(board)}x{len(board)}, but the solver was set up for "
+                             f"{self.size}x{self.size} boards")
+
+        self.board = board
+        self.first_solution = None
+        self.partial.clear()
+        while self.given_columns:
+            self.uncover(self.given_columns.pop())
+
+        # givens are placed up front by covering their columns (a column covered twice = conflicting givens)
+        size = self.size
+        self.consistent = True
+        covered = set()
+        for cell in range(self.geometry.num_cells):
+            value = board[cell // size][cell % size]
+            if value == self.empty: continue
+            for column in self.placement_columns(cell, value):
+                if column in covered:
+                    self.consistent = False
+                    return
+                covered.add(column)
+                self.cover(column)
+                self.given_columns.append(column)
+
+    # the 4 constraint columns (1-based, column 0 is the root header) covered by placing value in cell
+    def placement_columns(self, cell, value):
+        size = self.size
+        num_cells = self.geometry.num_cells
+        v = value - 1
+        return (1 + cell,
+                1 + num_cells + self.geometry.row_of[cell] * size + v,
+                1 + 2 * num_cells + self.geometry.col_of[cell] * size + v,
+                1 + 3 * num_cells + self.geometry.box_of[cell] * size + v)
+
+    # builds the dancing-links matrix: node 0 is the root, nodes 1..324 are column headers (on a 9x9 board), then
+    #   4 nodes per matrix row
+    #   L/R/U/D = left/right/up/down links, C = column header of a node, S = number of nodes left in a column,
+    #   ROW = matrix row of a node (cell * size + value - 1)
+    def build_matrix(self):
+        size = self.size
+        num_columns = 4 * self.geometry.num_cells
+        num_nodes = 1 + num_columns + 4 * self.geometry.num_cells * size
+
+        L = self.L = list(range(-1, num_nodes - 1))
+        R = self.R = list(range(1, num_nodes + 1))
+        U = self.U = list(range(num_nodes))
+        D = self.D = list(range(num_nodes))
+        C = self.C = list(range(num_nodes))
+        S = self.S = [0] * (num_columns + 1)
+        ROW = self.ROW = [-1] * num_nodes
+
+        # header row is circular through the root
+        L[0] = num_columns
+        R[num_columns] = 0
+
+        node = num_columns + 1
+        for cell in range(self.geometry.num_cells):
+            for value in range(1, size + 1):
+                first = node
+                for column in self.placement_columns(cell, value):
+                    # append node at the bottom of its column
+                    C[node] = column
+                    ROW[node] = cell * size + value - 1
+                    U[node] = U[column]
+                    D[node] = column
+                    D[U[column]] = node
+                    U[column] = node
+                    S[column] += 1
+                    # link into the row's circular list
+                    L[node] = node - 1
+                    R[node] = node + 1
+                    node += 1
+                L[first] = node - 1
+                R[node - 1] = first
+
+    # removes a column from the header list and every row that uses it from the other columns
+    def cover(self, c):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        R[L[c]] = R[c]
+        L[R[c]] = L[c]
+        i = D[c]
+        while i != c:
+            j = R[i]
+            while j != i:
+                U[D[j]] = U[j]
+                D[U[j]] = D[j]
+                S[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    # exact reverse of cover (the "dancing" part: the removed nodes still point to where they were)
+    def uncover(self, c):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        i = U[c]
+        while i != c:
+            j = L[i]
+            while j != i:
+                S[C[j]] += 1
+                U[D[j]] = j
+                D[U[j]] = j
+                j = L[j]
+            i = U[i]
+        R[L[c]] = c
+        L[R[c]] = c
+
+    # main solving method; returns TRUE if solution is found (and written into the board), FALSE otherwise
+    def solve(self):
+        if not self.consistent: return False
+        if self.search(1) == 0: return False
+        self.write_solution(self.first_solution)
+        return True
+
+    # counts the board's solutions, stopping early once limit is reached (limit=None counts them all)
+    def count_solutions(self, limit=None):
+        if not self.consistent: return 0
+        return self.search(limit)
+
+    # checks if the board has exactly one solution (stops as soon as a second one turns up)
+    def has_unique_solution(self):
+        return self.count_solutions(limit=2) == 1
+
+    # Algorithm X: returns the number of solutions found below the current node (stops once limit is reached)
+    #   always picks the column with the fewest rows left (the exact-cover version of MRV)
+    def search(self, limit=None):
+        R, D, C, S, ROW = self.R, self.D, self.C, self.S, self.ROW
+        if R[0] == 0:  # every column covered: solution found
+            if self.first_solution is None: self.first_solution = list(self.partial)
+            return 1
+
+        c = R[0]
+        best = c
+        while c != 0:
+            if S[c] < S[best]:
+                best = c
+                if S[c] == 0: break
+            c = R[c]
+        if S[best] == 0: return 0
+
+        c = best
+        found = 0
+        self.cover(c)
+        r = D[c]
+        while r != c and (limit is None or found < limit):
+            self.partial.append(ROW[r])
+            j = R[r]
+            while j != r:
+                self.cover(C[j])
+                j = R[j]
+
+            found += self.search(None if limit is None else limit - found)
+
+            j = self.L[r]
+            while j != r:
+                self.uncover(C[j])
+                j = self.L[j]
+            self.partial.pop()
+            r = D[r]
+        self.uncover(c)
+        return found
+
+    # writes picked matrix rows (cell * size + value - 1) into the board
+    def write_solution(self, rows):
+        size = self.size
+        for row in rows:
+            cell, value = divmod(row, size)
+            self.board[cell // size][cell % size] = value + 1
@@ -0,0 +1,330 @@
+#
+# Domain storage backends for the CSP Sudoku solver
+#   a "domain" is the set of values an empty cell can still take (starts as [1-9] on a 9x9 board and shrinks as
+#   constraints are applied)
+#   both backends expose the same methods, so the solver can switch between them with its domain_backend flag
+#   cells are identified by their flat index (row * size + col), the same keys used by the geometry tables
+#   every change is recorded on a trail (undo log), so backtracking rewinds only what changed instead of copying all domains
+#   both are sized per board: size = number of values (9 for a 9x9 board, 16 for 16x16, ...)
+#
+
+# largest board size whose mask tables are built in full (2^16 entries each); bigger boards fill them in on demand
+MAX_TABLE_SIZE = 16
+
+# most masks a table filled in on demand keeps before starting over
+MAX_LAZY_MASKS = 1 << 20
+
+
+# popcount and values-of-mask tables, indexed by mask, for boards up to MAX_TABLE_SIZE values
+#   popcount[mask] = number of values in mask, values[mask] = sorted tuple of the values it holds
+#   (bit v-1 set means value v is still allowed)
+def full_tables(size):
+    popcount = [bin(mask).count('1') for mask in range(1 << size)]
+    values = [tuple(v for v in range(1, size + 1) if mask & (1 << (v - 1))) for mask in range(1 << size)]
+    return popcount, values
+
+
+# same lookups as the full tables (table[mask]) for masks too wide to tabulate: entries are computed on first use
+class LazyPopcount(dict):
+    def __missing__(self, mask):
+        if len(self) >= MAX_LAZY_MASKS: self.clear()
+        count = self[mask] = bin(mask).count('1')
+        return count
+
+
+class LazyMaskValues(dict):
+    def __init__(self, size):
+        super().__init__()
+        self.size = size
+
+    def __missing__(self, mask):
+        if len(self) >= MAX_LAZY_MASKS: self.clear()
+        values = self[mask] = tuple(v for v in range(1, self.size + 1) if mask & (1 << (v - 1)))
+        return values
+
+
+# mask tables already built, keyed by board size (shared by every BitmaskDomains of that size)
+_MASK_TABLES = {}
+
+
+# returns the (shared) popcount and values-of-mask tables for a board size
+def get_mask_tables(size):
+    tables = _MASK_TABLES.get(size)
+    if tables is None:
+        if size <= MAX_TABLE_SIZE:
+            tables = full_tables(size)
+        else:
+            tables = LazyPopcount(), LazyMaskValues(size)
+        _MASK_TABLES[size] = tables
+    return tables
+
+
+# tables for the standard 9x9 board (popcount lookup used by MRV, values of a 9-bit mask)
+POPCOUNT, MASK_VALUES = get_mask_tables(9)
+
+
+# original backend: one python set per empty cell, stored in a dict keyed by cell index (None once a cell is assigned)
+class SetDomains:
+    def __init__(self, size=9):
+        self.size = size
+        self.cells = {}
+        self.trail = []
+
+    # forgets every domain (and the trail) so the store can be refilled for a new board
+    def clear(self):
+        self.cells.clear()
+        self.trail.clear()
+
+    # adds an empty cell with its starting values
+    def add(self, var, values):
+        self.cells[var] = set(values)
+
+    def __contains__(self, var):
+        return self.cells.get(var) is not None
+
+    def __iter__(self):
+        return (var for var, domain in self.cells.items() if domain is not None)
+
+    def __len__(self):
+        return sum(1 for domain in self.cells.values() if domain is not None)
+
+    # values left in a cell's domain (ascending tuple, same as the bitmask backend: the naked-pairs rule uses it as a
+    #   dict key, so it must be hashable)
+    def values(self, var):
+        return tuple(sorted(self.cells[var]))
+
+    # number of values left in a cell's domain
+    def count(self, var):
+        return len(self.cells[var])
+
+    # checks if value is still allowed in a cell (FALSE for cells that are not empty)
+    def has(self, var, value):
+        domain = self.cells.get(var)
+        return domain is not None and value in domain
+
+    # removes value from a cell's domain; returns TRUE if it was there
+    def discard(self, var, value):
+        domain = self.cells.get(var)
+        if domain is None or value not in domain: return False
+        domain.remove(value)
+        self.trail.append((var, value))
+        return True
+
+    # drops a cell once it gets assigned a value
+    def remove(self, var):
+        self.trail.append((var, self.cells[var]))
+        self.cells[var] = None
+
+    # current trail position, to rewind to later
+    def mark(self):
+        return len(self.trail)
+
+    # cells whose domain changed (or that got assigned) since mark
+    def changed_since(self, mark):
+        return {var for var, _ in self.trail[mark:]}
+
+    # undoes every change made since mark (trail entries are a removed value, or the whole set of an assigned cell)
+    def undo(self, mark):
+        trail = self.trail
+        cells = self.cells
+        while len(trail) > mark:
+            var, change = trail.pop()
+            if type(change) is int:
+                cells[var].add(change)
+            else:
+                cells[var] = change
+
+    # removes values from xi's domain that have no supporting value in xj's domain; returns TRUE if anything was removed
+    #   the constraint is xi != xj, so a value x only loses its support when xj's domain is exactly {x} (or empty):
+    #   constant work per arc, and no copy of the domain
+    def revise(self, xi, xj):
+        domain_j = self.cells[xj]
+        if len(domain_j) > 1: return False  # xj has 2+ values, so every x has support
+        domain_i = self.cells[xi]
+        if not domain_j:
+            if not domain_i: return False
+            for x in domain_i:
+                self.trail.append((xi, x))
+            domain_i.clear()
+            return True
+        for x in domain_j:
+            if x not in domain_i: return False
+            domain_i.remove(x)
+            self.trail.append((xi, x))
+        return True
+
+    # MRV: first cell with the fewest values left (None if every cell is assigned)
+    def smallest(self):
+        min_length = float('inf')
+        min_var = None
+        for var, domain in self.cells.items():
+            if domain is None: continue
+            domain_length = len(domain)
+            if domain_length < min_length:
+                min_length = domain_length
+                min_var = var
+        return min_var
+
+    # every cell with the fewest values left (empty list if every cell is assigned)
+    def all_smallest(self):
+        min_length = float('inf')
+        ties = []
+        for var, domain in self.cells.items():
+            if domain is None: continue
+            domain_length = len(domain)
+            if domain_length < min_length:
+                min_length = domain_length
+                ties = [var]
+            elif domain_length == min_length:
+                ties.append(var)
+        return ties
+
+
+# bitmask backend: each domain is a size-bit integer in a flat list with one entry per cell (None for cells that are
+#   not empty)
+#   avoids allocating and hashing sets in the hot paths; MRV uses a popcount table and propagation just clears bits
+class BitmaskDomains:
+    def __init__(self, size=9):
+        self.size = size
+        self.masks = [None] * (size * size)
+        self.trail = []
+        self.popcount, self.mask_values = get_mask_tables(size)
+
+    def clear(self):
+        masks = self.masks
+        for var in range(len(masks)):
+            masks[var] = None
+        self.trail.clear()
+
+    def add(self, var, values):
+        mask = 0
+        for value in values:
+            mask |= 1 << (value - 1)
+        self.masks[var] = mask
+
+    def __contains__(self, var):
+        return self.masks[var] is not None
+
+    def __iter__(self):
+        return (var for var, mask in enumerate(self.masks) if mask is not None)
+
+    def __len__(self):
+        return sum(1 for mask in self.masks if mask is not None)
+
+    def values(self, var):
+        return self.mask_values[self.masks[var]]
+
+    def count(self, var):
+        return self.popcount[self.masks[var]]
+
+    def has(self, var, value):
+        mask = self.masks[var]
+        return mask is not None and mask & (1 << (value - 1)) != 0
+
+    def discard(self, var, value):
+        mask = self.masks[var]
+        bit = 1 << (value - 1)
+        if mask is None or not mask & bit: return False
+        self.trail.append((var, mask))
+        self.masks[var] = mask & ~bit
+        return True
+
+    def remove(self, var):
+        self.trail.append((var, self.masks[var]))
+        self.masks[var] = None
+
+    def mark(self):
+        return len(self.trail)
+
+    def changed_since(self, mark):
+        return {var for var, _ in self.trail[mark:]}
+
+    # trail entries are (cell, mask before the change)
+    def undo(self, mark):
+        trail = self.trail
+        masks = self.masks
+        while len(trail) > mark:
+            var, mask = trail.pop()
+            masks[var] = mask
+
+    # with a not-equal constraint, a value x in xi only loses its support when xj's domain is exactly {x} (or empty)
+    def revise(self, xi, xj):
+        mask_i = self.masks[xi]
+        mask_j = self.masks[xj]
+        if mask_j & (mask_j - 1): return False  # xj has 2+ values, so every x has support
+        new_mask = mask_i & ~mask_j if mask_j else 0
+        if new_mask == mask_i: return False
+        self.trail.append((xi, mask_i))
+        self.masks[xi] = new_mask
+        return True
+
+    def smallest(self):
+        popcount = self.popcount
+        min_length = self.size + 1
+        min_var = None
+        for var, mask in enumerate(self.masks):
+            if mask is not None:
+                domain_length = popcount[mask]
+                if domain_length < min_length:
+                    min_length = domain_length
+                    min_var = var
+                    if domain_length == 0: break
+        return min_var
+
+    def all_smallest(self):
+        popcount = self.popcount
+        min_length = self.size + 1
+        ties = []
+        for var, mask in enumerate(self.masks):
+            if mask is not None:
+                domain_length = popcount[mask]
+                if domain_length < min_length:
+                    min_length = domain_length
+                    ties = [var]
+                    if domain_length == 0: break
+                elif domain_length == min_length:
+                    ties.append(var)
+        return ties
+
+
+# domain backends selectable by name
+DOMAIN_BACKENDS = {'set': SetDomains, 'bitmask': BitmaskDomains}
+
+
+# adds removal times to a backend: removed_at[var * (size + 1) + value] = trail position of the value's latest removal
+#   from the cell (only meaningful while the value is removed: undoing a removal leaves a stale entry, but the value is
+#   back in the domain then, and removing it again overwrites it)
+#   nogood learning needs these to explain reductions (see nogoods.py); the plain backends skip the bookkeeping
+class RemovalTimes:
+    def __init__(self, size=9):
+        super().__init__(size)
+        self.stride = size + 1
+        self.removed_at = [0] * (size * size * self.stride)
+
+    def discard(self, var, value):
+        position = len(self.trail)
+        if not super().discard(var, value): return False
+        self.removed_at[var * self.stride + value] = position
+        return True
+
+    def revise(self, xi, xj):
+        position = len(self.trail)
+        before = self.values(xi)
+        if not super().revise(xi, xj): return False
+        base = xi * self.stride
+        for value in before:
+            if not self.has(xi, value):
+                self.removed_at[base + value] = position
+        return True
+
+
+class TimedSetDomains(RemovalTimes, SetDomains):
+    pass
+
+
+class TimedBitmaskDomains(RemovalTimes, BitmaskDomains):
+    pass
+
+
+# the same backends with removal times, by name
+TIMED_BACKENDS = {'set': TimedSetDomains, 'bitmask': TimedBitmaskDomains}
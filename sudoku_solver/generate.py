@@ -0,0 +1,119 @@
+#
+# Puzzle generator built on the CSP solver
+#   1. a random complete grid comes from solving an empty board with values tried in random order
+#   2. clues are then removed one at a time (in random order), keeping a removal only if the puzzle still has
+#      exactly one solution (and still fits the requested difficulty)
+#   one solver per check type is reset for every candidate board, so the many uniqueness checks reuse its buffers
+#
+
+import random
+from .solver import SudokuSolver
+from .utils import copy_board
+
+# difficulty bands, by what it takes to solve a puzzle:
+#   'easy' = naked/hidden singles alone, 'medium' = every inference rule but no guessing, 'hard' = needs search
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+# solver settings for filling a grid and for the uniqueness checks: forward checking only
+#   these searches are short (an empty board, or a puzzle one clue away from unique), so AC-3, LCV and the inference
+#   rules cost more per node than they save in nodes
+CHECK_OPTIONS = {'use_ac3': False, 'use_lcv': False, 'use_naked_singles': False, 'use_hidden_singles': False,
+                 'use_naked_pairs': False, 'use_hidden_pairs': False, 'use_locked_candidates': False}
+
+# solver settings for rating a puzzle: only the inference rules that the band allows
+RATING_OPTIONS = {
+    'easy': {'use_ac3': False, 'use_naked_pairs': False, 'use_hidden_pairs': False, 'use_locked_candidates': False},
+    'medium': {'use_naked_pairs': True, 'use_hidden_pairs': True, 'use_locked_candidates': True},
+}
+
+
+# returns a random complete (solved) grid
+def generate_solution(rng=None):
+    rng = rng or random.Random()
+    board = [[0] * 9 for _ in range(9)]
+    SudokuSolver(board, rng=rng, **CHECK_OPTIONS).solve()
+    return board
+
+
+# reuses one solver per job for every board a generator run looks at
+class PuzzleGenerator:
+    def __init__(self, rng=None):
+        self.rng = rng or random.Random()
+        empty = [[0] * 9 for _ in range(9)]
+        self.filler = SudokuSolver(copy_board(empty), rng=self.rng, **CHECK_OPTIONS)
+        self.checker = SudokuSolver(copy_board(empty), **CHECK_OPTIONS)
+        self.raters = {band: SudokuSolver(copy_board(empty), **options) for band, options in RATING_OPTIONS.items()}
+
+    # returns a random complete grid (same as generate_solution, with the generator's solver)
+    def new_solution(self):
+        board = [[0] * 9 for _ in range(9)]
+        self.filler.reset(board)
+        self.filler.solve()
+        return board
+
+    # checks that puzzle (which has a unique solution with cell = value) stays unique once that clue is removed
+    #   any other solution would also solve the puzzle with the clue, unless it puts a different value in the cell,
+    #   so it's enough to look for a single solution with value ruled out of the cell
+    def still_unique(self, puzzle, cell, value):
+        board = copy_board(puzzle)
+        board[cell // 9][cell % 9] = 0
+        self.checker.reset(board)
+        self.checker.domains.discard(cell, value)
+        return not self.checker.solve()
+
+    # checks if propagation alone (with the rules allowed by band) solves puzzle, i.e. no guessing is needed
+    def solved_by_propagation(self, puzzle, band):
+        rater = self.raters[band]
+        rater.reset(copy_board(puzzle))
+        if rater.propagate() is not None: return False
+        return all(rater.domains.count(var) == 1 for var in rater.domains)
+
+    # difficulty band of a puzzle with a unique solution
+    def rate(self, puzzle):
+        if self.solved_by_propagation(puzzle, 'easy'): return 'easy'
+        if self.solved_by_propagation(puzzle, 'medium'): return 'medium'
+        return 'hard'
+
+    # removes clues from a solved grid in random order while the puzzle stays unique (and, for 'easy' and 'medium',
+    #   solvable without guessing), stopping at `clues` clues if given; returns the puzzle
+    def reduce(self, solution, clues=None, difficulty=None):
+        puzzle = copy_board(solution)
+        remaining = 81
+        cells = list(range(81))
+        self.rng.shuffle(cells)
+        for cell in cells:
+            if clues is not None and remaining <= clues: break
+            row, col = cell // 9, cell % 9
+            value = puzzle[row][col]
+            if not self.still_unique(puzzle, cell, value): continue
+            puzzle[row][col] = 0
+            if difficulty in RATING_OPTIONS and not self.solved_by_propagation(puzzle, difficulty):
+                puzzle[row][col] = value  # too hard for the band: keep the clue
+                continue
+            remaining -= 1
+        return puzzle
+
+    # generates a puzzle with a unique solution; returns (puzzle, solution)
+    #   clues = stop removing clues once this many are left (None = remove as many as possible, usually 22-26 left)
+    #   difficulty = one of DIFFICULTIES (None = any); grids are retried until one lands in the band
+    def generate(self, clues=None, difficulty=None, max_attempts=100):
+        if difficulty is not None and difficulty not in DIFFICULTIES:
+            raise ValueError(f"Unknown difficulty: {difficulty}")
+        for _ in range(max_attempts):
+            solution = self.new_solution()
+            puzzle = self.reduce(solution, clues, difficulty)
+            if difficulty is None or self.rate(puzzle) == difficulty:
+                return puzzle, solution
+        raise RuntimeError(f"No {difficulty} puzzle found in {max_attempts} attempts")
+
+
+# generates one puzzle with a unique solution; returns (puzzle, solution) (see PuzzleGenerator.generate)
+def generate_puzzle(clues=None, difficulty=None, rng=None):
+    return PuzzleGenerator(rng).generate(clues, difficulty)
+
+
+# yields count puzzles (puzzle, solution) from one generator, so the solvers are set up only once
+def generate_puzzles(count, clues=None, difficulty=None, rng=None):
+    generator = PuzzleGenerator(rng)
+    for _ in range(count):
+        yield generator.generate(clues, difficulty)
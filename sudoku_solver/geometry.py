@@ -0,0 +1,50 @@
+#
+# Precomputed board geometry for the CSP Sudoku solver
+#   units (rows, columns, boxes) and the peers of every cell, keyed by flat cell index (row * size + col)
+#   built lazily, once per box size, and shared read-only by every solver instance
+#
+
+# geometry tables already built, keyed by box size
+_GEOMETRIES = {}
+
+
+# all tables for one board shape (box_size=3 is the standard 9x9 board); everything is a tuple so it can be shared safely
+class Geometry:
+    def __init__(self, box_size=3):
+        size = box_size * box_size
+        self.box_size = box_size
+        self.size = size
+        self.num_cells = size * size
+
+        # row, column and box of every cell
+        self.row_of = tuple(idx // size for idx in range(self.num_cells))
+        self.col_of = tuple(idx % size for idx in range(self.num_cells))
+        self.box_of = tuple((row // box_size) * box_size + col // box_size
+                            for row, col in zip(self.row_of, self.col_of))
+
+        # units: the groups of cells that must all hold different values
+        self.rows = tuple(tuple(row * size + col for col in range(size)) for row in range(size))
+        self.cols = tuple(tuple(row * size + col for row in range(size)) for col in range(size))
+        self.boxes = tuple(tuple(idx for idx in range(self.num_cells) if self.box_of[idx] == box)
+                           for box in range(size))
+        self.units = self.rows + self.cols + self.boxes
+
+        # the 3 units of each cell (row, column, box)
+        self.units_of = tuple((self.rows[self.row_of[idx]], self.cols[self.col_of[idx]], self.boxes[self.box_of[idx]])
+                              for idx in range(self.num_cells))
+
+        # indices (into units) of the 3 units of each cell, so the units around a set of cells can be collected cheaply
+        self.unit_indices_of = tuple((self.row_of[idx], size + self.col_of[idx], 2 * size + self.box_of[idx])
+                                     for idx in range(self.num_cells))
+
+        # peers: every other cell sharing a unit with the cell (20 of them on a 9x9 board), in ascending order
+        self.peers = tuple(tuple(sorted(set(row + col + box) - {idx}))
+                           for idx, (row, col, box) in enumerate(self.units_of))
+
+
+# returns the (shared) geometry tables for a box size, building them on first use
+def get_geometry(box_size=3):
+    geometry = _GEOMETRIES.get(box_size)
+    if geometry is None:
+        geometry = _GEOMETRIES[box_size] = Geometry(box_size)
+    return geometry
@@ -0,0 +1,165 @@
+#
+# Unit-level inference rules for the CSP Sudoku solver
+#   forward checking and AC-3 only look at pairs of cells; these rules look at whole units (rows, columns, boxes)
+#   every rule has the same shape: rule(domains, grid, geometry, cells) -> None if consistent, set of conflicting cells
+#   if not; cells = the cells changed since the rule last ran (None = look at the whole board), since a unit none of
+#   whose cells changed has nothing new to give
+#   rules only shrink domains through domains.discard, so every reduction they make lands on the trail and gets undone
+#   with the rest of the move on backtracking
+#
+
+
+# indices (into geometry.units) of the units holding any of cells, in board order; every unit if cells is None
+def touched_units(geometry, cells):
+    if cells is None: return range(len(geometry.units))
+    unit_indices_of = geometry.unit_indices_of
+    return sorted({index for cell in cells for index in unit_indices_of[cell]})
+
+
+# values already placed in a unit (cells no longer in the domains are givens or assigned)
+def placed_values(unit, domains, grid):
+    return {grid[cell] for cell in unit if cell not in domains}
+
+
+# maps each value to the unassigned cells of a unit that can still hold it
+def value_places(unit, domains):
+    places = {}
+    for cell in unit:
+        if cell in domains:
+            for value in domains.values(cell):
+                places.setdefault(value, []).append(cell)
+    return places
+
+
+# shrinks a cell's domain down to keep (a collection of values)
+def restrict(domains, cell, keep):
+    for value in domains.values(cell):
+        if value not in keep:
+            domains.discard(cell, value)
+
+
+# naked single: a cell with one value left forces that value out of all of its peers
+def naked_singles(domains, grid, geometry, cells=None):
+    for cell in list(domains) if cells is None else [cell for cell in cells if cell in domains]:
+        count = domains.count(cell)
+        if count == 0: return {cell}
+        if count != 1: continue
+        value = domains.values(cell)[0]
+        for peer in geometry.peers[cell]:
+            if domains.discard(peer, value) and domains.count(peer) == 0:
+                return {cell, peer}
+    return None
+
+
+# hidden single: if a value fits in only one cell of a unit, that cell must take it
+#   (a value that fits nowhere in a unit and isn't placed there yet is a dead end)
+def hidden_singles(domains, grid, geometry, cells=None):
+    size = geometry.size
+    for index in touched_units(geometry, cells):
+        unit = geometry.units[index]
+        places = value_places(unit, domains)
+        placed = placed_values(unit, domains, grid)
+        for value in range(1, size + 1):
+            if value in placed: continue
+            holders = places.get(value)
+            if not holders: return set(unit)
+            if len(holders) == 1 and domains.count(holders[0]) > 1:
+                restrict(domains, holders[0], (value,))
+    return None
+
+
+# naked pair: two cells of a unit with the same 2 values left must hold those 2 values between them,
+#   so no other cell in the unit can take either value
+def naked_pairs(domains, grid, geometry, cells=None):
+    for index in touched_units(geometry, cells):
+        unit = geometry.units[index]
+        pairs = {}
+        for cell in unit:
+            if cell in domains and domains.count(cell) == 2:
+                pairs.setdefault(domains.values(cell), []).append(cell)
+        for pair, holders in pairs.items():
+            if len(holders) < 2: continue
+            if len(holders) > 2: return set(holders)  # 3 cells can't share 2 values
+            for cell in unit:
+                if cell in domains and cell not in holders:
+                    for value in pair:
+                        domains.discard(cell, value)
+                    if domains.count(cell) == 0: return {cell} | set(holders)
+    return None
+
+
+# hidden pair: if 2 values of a unit only fit in the same 2 cells, those cells can't take anything else
+def hidden_pairs(domains, grid, geometry, cells=None):
+    for index in touched_units(geometry, cells):
+        unit = geometry.units[index]
+        placed = placed_values(unit, domains, grid)
+        twos = {}
+        for value, places in value_places(unit, domains).items():
+            if value not in placed and len(places) == 2:
+                twos.setdefault(tuple(places), []).append(value)
+        for places, values in twos.items():
+            if len(values) > 2: return set(places)  # 3 values can't share 2 cells
+            if len(values) != 2: continue
+            for cell in places:
+                if domains.count(cell) > 2:
+                    restrict(domains, cell, values)
+    return None
+
+
+# pointing / claiming (locked candidates): when a value's remaining places in one unit all lie inside a second unit,
+#   the value must go in their intersection, so it is removed from the rest of the second unit
+#   pointing = box -> row/column, claiming = row/column -> box
+def locked_candidates(domains, grid, geometry, cells=None):
+    row_of, col_of, box_of = geometry.row_of, geometry.col_of, geometry.box_of
+    lines = 2 * geometry.size  # (units are the rows and columns, then the boxes)
+    touched = touched_units(geometry, cells)
+    checks = [([index for index in touched if index >= lines], ((row_of, geometry.rows), (col_of, geometry.cols)))]
+    checks.append(([index for index in touched if index < lines], ((box_of, geometry.boxes),)))
+    for indices, targets in checks:
+        for index in indices:
+            unit = geometry.units[index]
+            placed = placed_values(unit, domains, grid)
+            for value, places in value_places(unit, domains).items():
+                if value in placed: continue
+                for index_of, target_units in targets:
+                    target = index_of[places[0]]
+                    if any(index_of[cell] != target for cell in places): continue
+                    for cell in target_units[target]:
+                        if cell not in unit and domains.discard(cell, value) and domains.count(cell) == 0:
+                            return {cell} | set(places)
+    return None
+
+
+# rules in the order the pipeline runs them (cheapest first), with the solver flag that turns each one on
+INFERENCE_RULES = (
+    ('use_naked_singles', naked_singles),
+    ('use_hidden_singles', hidden_singles),
+    ('use_naked_pairs', naked_pairs),
+    ('use_hidden_pairs', hidden_pairs),
+    ('use_locked_candidates', locked_candidates),
+)
+
+
+# runs the rules to a fixpoint: whenever a rule shrinks a domain, start over from the first (cheapest) rule, so the
+#   pair and locked-candidate rules only run once the singles have stalled
+#   incremental: each rule only looks at the cells changed since it last ran, starting from mark, the trail position
+#   at which the domains were last at a fixpoint (e.g. just before the assignment being propagated); None = the whole
+#   board, as for root propagation
+#   returns None if consistent, set of conflicting cells if a rule finds a dead end
+#   pruned = optional Counter, gets the domain reductions made by each rule added under the rule's name
+def run_pipeline(rules, domains, grid, geometry, pruned=None, mark=None):
+    starts = [mark] * len(rules)  # trail position each rule last ran at
+    i = 0
+    while i < len(rules):
+        start, mark = starts[i], domains.mark()
+        if start == mark:  # nothing changed since this rule last ran
+            i += 1
+            continue
+        conflicts = rules[i](domains, grid, geometry, None if start is None else domains.changed_since(start))
+        starts[i] = mark
+        changed = domains.mark() - mark
+        if pruned is not None and changed:
+            pruned[rules[i].__name__] += changed
+        if conflicts is not None: return conflicts
+        i = 0 if changed else i + 1
+    return None
@@ -0,0 +1,189 @@
+#
+# Nogood learning for the CSP Sudoku solver (use_nogoods=True)
+#   a nogood is a partial assignment known to have no solution: a tuple of (cell, value) literals that can't all hold
+#   at once; once a search frame runs out of values, its conflict set (the assigned cells whose values ruled out every
+#   one of its values) gives a new nogood, and the search never goes down a branch that contains a known one again
+#   conflict sets are only sound if they explain every domain reduction, so with learning on they are built by explain
+#   below instead of taken from whatever cells the propagator that failed happened to look at
+#   nogoods are checked with two watched literals: a nogood is only looked at when one of its two watched literals
+#   becomes true (its cell is assigned that value), and when all but one of its literals hold, the last one's value is
+#   pruned from its cell
+#   the store is bounded: nogoods longer than max_length aren't kept (long ones hardly ever fire again), and past
+#   max_nogoods the half that pruned least is evicted
+#
+
+from bisect import bisect_left
+
+# default limits of a NogoodStore
+MAX_NOGOODS = 2000
+MAX_NOGOOD_LENGTH = 16
+
+
+# one learned nogood: literals are ordered deepest assignment first, watched = indices of its 2 watched literals
+#   (the same index twice for a one-literal nogood), activity = conflicts and prunes it caused (for eviction)
+class Nogood:
+    def __init__(self, literals):
+        self.literals = literals
+        self.watched = [0, min(1, len(literals) - 1)]
+        self.activity = 0
+
+    def cells(self):
+        return {cell for cell, _ in self.literals}
+
+
+# watched-literal nogood store for one board
+#   watches[cell * (size + 1) + value] = nogoods watching the literal (cell, value)
+class NogoodStore:
+    def __init__(self, num_cells, size, max_nogoods=MAX_NOGOODS, max_length=MAX_NOGOOD_LENGTH):
+        self.stride = size + 1
+        self.max_nogoods = max_nogoods
+        self.max_length = max_length
+        self.watches = [[] for _ in range(num_cells * self.stride)]
+        self.nogoods = []
+
+    def __len__(self):
+        return len(self.nogoods)
+
+    # forgets every nogood (they only hold for the board they were learned on)
+    def clear(self):
+        for watchers in self.watches:
+            watchers.clear()
+        self.nogoods.clear()
+
+    # stores a nogood (literals deepest assignment first, as (cell, value) pairs); returns it, or None if it is too long
+    #   to keep
+    def add(self, literals):
+        if not literals or len(literals) > self.max_length: return None
+        nogood = Nogood(tuple(literals))
+        self.nogoods.append(nogood)
+        self.watch(nogood)
+        if len(self.nogoods) > self.max_nogoods:
+            self.evict()
+        return nogood
+
+    def watch(self, nogood):
+        first, second = nogood.watched
+        for index in {first, second}:
+            cell, value = nogood.literals[index]
+            self.watches[cell * self.stride + value].append(nogood)
+
+    # keeps the half of the nogoods that pruned most (shorter ones first on ties), and halves their activity so
+    #   that old successes fade
+    def evict(self):
+        self.nogoods.sort(key=lambda nogood: (-nogood.activity, len(nogood.literals)))
+        del self.nogoods[self.max_nogoods // 2:]
+        for watchers in self.watches:
+            watchers.clear()
+        for nogood in self.nogoods:
+            nogood.activity //= 2
+            self.watch(nogood)
+
+    # visits the nogoods watching (var, value) after var was assigned value
+    #   a nogood with another literal that doesn't hold moves its watch there; otherwise, if its other watched literal
+    #   holds too the nogood is violated and returned (the assignment fails), and if that literal's cell is still
+    #   empty its value is pruned from it: pruned gets (cell, value, trail position, nogood) for each one
+    #   returns None if no nogood is violated
+    def assign(self, var, value, grid, domains, pruned):
+        watchers = self.watches[var * self.stride + value]
+        i = 0
+        while i < len(watchers):
+            nogood = watchers[i]
+            literals = nogood.literals
+            watched = nogood.watched
+            if literals[watched[0]] != (var, value):
+                watched.reverse()
+            other_cell, other_value = literals[watched[1]]
+            if grid[other_cell] and grid[other_cell] != other_value:  # other watch's cell holds another value: can't fire
+                i += 1
+                continue
+            for index, (cell, literal_value) in enumerate(literals):
+                if index != watched[1] and grid[cell] != literal_value:
+                    watched[0] = index
+                    self.watches[cell * self.stride + literal_value].append(nogood)
+                    watchers[i] = watchers[-1]
+                    watchers.pop()
+                    break
+            else:
+                i += 1
+                if grid[other_cell] == other_value:
+                    nogood.activity += 1
+                    return nogood
+                position = domains.mark()
+                if domains.discard(other_cell, other_value):
+                    nogood.activity += 1
+                    pruned.append((other_cell, other_value, position, nogood))
+        return None
+
+
+# explains domain reductions: returns the set of search-assigned cells whose current values imply that every
+#   (cell, value) in removals is ruled out
+#   decisions = cells assigned by the search, in order, decision_marks = trail position of each one's assignment,
+#   reasons = (cell, value) -> (trail position, cells) for values pruned by nogoods
+#   each removal is explained by the first of these that applies (every step only uses facts that held before the
+#   removal happened, so the explanation is well-founded):
+#     a peer holds the value (that peer, if the search assigned it; nothing for a given)
+#     a peer had no other value left (the explanations of that peer's other values)
+#     the cell was the only place left for its last value in one of its units (the unit's assigned cells, and the
+#       explanations of that value's removal from the rest of the unit)
+#     a nogood pruned it (that nogood's other cells)
+#     otherwise (e.g. a pair rule) every decision made before the removal
+def explain(removals, domains, grid, geometry, decisions, decision_marks, reasons):
+    removed_at = domains.removed_at
+    stride = domains.stride
+    peers = geometry.peers
+    values = range(1, geometry.size + 1)
+    decided = set(decisions)
+    explanation = set()
+    prefix = 0  # explanation includes decisions[:prefix]
+    seen = set(removals)
+    work = list(removals)
+    while work:
+        cell, value = work.pop()
+
+        # a peer holds the value
+        holder = next((peer for peer in peers[cell] if grid[peer] == value), None)
+        if holder is not None:
+            if holder in decided: explanation.add(holder)
+            continue
+
+        if domains.has(cell, value) or cell not in domains:  # (not a removal: fall back to every decision)
+            prefix = len(decisions)
+            continue
+        position = removed_at[cell * stride + value]
+
+        # a peer was down to this value (or nothing) before the removal
+        causes = None
+        for peer in peers[cell]:
+            if peer in domains and domains.count(peer) <= 1 and domains.values(peer) in ((), (value,)):
+                base = peer * stride
+                if all(removed_at[base + other] < position for other in values if other != value):
+                    causes = [(peer, other) for other in values if other != value]
+                    break
+
+        # hidden single: the cell was the only place left for its last value in one of its units
+        if causes is None and domains.count(cell) == 1:
+            single = domains.values(cell)[0]
+            for unit in geometry.units_of[cell]:
+                others = [(peer, single) for peer in unit if peer != cell and peer in domains]
+                if all(not domains.has(peer, single) and removed_at[peer * stride + single] < position
+                       for peer, _ in others) and all(grid[peer] != single for peer in unit):
+                    explanation.update(peer for peer in unit if peer in decided)
+                    causes = others
+                    break
+
+        if causes is not None:
+            for removal in causes:
+                if removal not in seen:
+                    seen.add(removal)
+                    work.append(removal)
+            continue
+
+        # pruned by a nogood
+        reason = reasons.get((cell, value))
+        if reason is not None and reason[0] == position:
+            explanation.update(reason[1])
+            continue
+
+        prefix = max(prefix, bisect_left(decision_marks, position))
+    explanation.update(decisions[:prefix])
+    return explanation
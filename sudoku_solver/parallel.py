@@ -0,0 +1,221 @@
+#
+# Parallel search of a single puzzle with work stealing: worker processes search different parts of one search tree
+#   the tree is first split at its first few MRV branch points into one task per worker; a task is a partial assignment
+#   (the branch decisions on the way to its subtree), sent in the compact format of pack_assignment, and each worker
+#   searches it with an ordinary SudokuSolver with the same options, so every subtree gets the same propagation
+#   subtrees differ wildly in size (most die fast, one holds the solution or most of the count), so a static split
+#   leaves workers idle: whenever one runs out of work, the coordinator asks a busy one for some, and that worker hands
+#   over the later half of the untried values of its shallowest open branch point (SudokuSolver.donate_branches) as
+#   new tasks, which it then skips itself
+#   every task is a set of values a cell had left after propagation, so the tasks cover every solution exactly once:
+#   solving stops every worker as soon as one finds a solution, counting adds up theirs
+#   workers search in slices of SLICE_NODES nodes (the search is resumable) and answer messages in between
+#
+
+from collections import deque
+import multiprocessing
+from multiprocessing.connection import wait
+import os
+import time
+from .solver import SudokuSolver, SOLVED, UNSOLVABLE, INVALID, TIMEOUT
+from .batch import SolveResult
+from .utils import copy_board, is_valid_board, pack_board, unpack_board, pack_assignment, unpack_assignment
+
+# search nodes a worker runs between two checks for messages
+SLICE_NODES = 64
+
+# deepest branch point the initial split goes down to
+MAX_SPLIT_DEPTH = 8
+
+
+# copy of board with a partial assignment ((cell, value) pairs) filled in
+def _assigned(board, assignment):
+    board = copy_board(board)
+    size = len(board)
+    for cell, value in assignment:
+        board[cell // size][cell % size] = value
+    return board
+
+
+# splits board into subtrees by expanding its search tree breadth-first until there are at least target open nodes
+#   (or MAX_SPLIT_DEPTH is reached): each node is propagated, and the cell its search would start with (the MRV cell)
+#   branched on
+#   returns (assignments, solutions): the open nodes as partial assignments, and the boards propagation alone solved
+def split_search(board, target, **options):
+    solver = SudokuSolver(copy_board(board), **options)
+    frontier = deque([((), 0)])
+    solutions = []
+    while frontier and len(frontier) < target and frontier[0][1] < MAX_SPLIT_DEPTH:
+        assignment, depth = frontier.popleft()
+        solver.reset(_assigned(board, assignment))
+        if not solver.start_search(): continue  # dead end
+        if not solver.stack:  # propagation filled in the whole board
+            solutions.append(copy_board(solver.board))
+            continue
+        var = solver.stack[-1][0]
+        values = solver.get_ordered_values(var)
+        for value in values:
+            frontier.append((assignment + ((var, value),), depth + (len(values) > 1)))  # (forced cells don't count)
+    return [list(assignment) for assignment, _ in frontier], solutions
+
+
+# one worker process: searches the tasks it gets for the given board and answers the coordinator over connection
+#   receives ('task', packed assignment) or ('steal', None); sends ('solution', packed board) when it finds one and
+#   find_one is set, ('count', 1) for every solution when report_each is set, ('work', [packed assignments]) in answer
+#   to a steal (empty if it has nothing to give), and ('idle', solutions not reported yet) once its task is done
+def _run_worker(connection, packed, options, find_one, report_each):
+    board = unpack_board(packed)
+    size = len(board)
+    solver = SudokuSolver(copy_board(board), **options)
+    while True:
+        kind, content = connection.recv()
+        if kind == 'steal':
+            connection.send(('work', []))
+            continue
+
+        base = unpack_assignment(content, size)
+        solver.reset(_assigned(board, base))
+        found = 0
+        if solver.start_search():
+            while True:
+                while connection.poll():
+                    connection.recv()  # (only steals arrive while a task runs)
+                    connection.send(('work', _donate(solver, base, size)))
+                result = solver.run_search(SLICE_NODES)
+                if result is None: continue
+                if result is False: break
+                if find_one:
+                    connection.send(('solution', pack_board(solver.board)))
+                    break
+                if report_each:
+                    connection.send(('count', 1))
+                else:
+                    found += 1
+        solver.cancel_search()
+        connection.send(('idle', found))
+
+
+# the part of a worker's search it gives away to a steal, as packed tasks (see SudokuSolver.donate_branches)
+def _donate(solver, base, size):
+    branches = solver.donate_branches()
+    if branches is None: return []
+    assignment, var, values = branches
+    return [pack_assignment(base + assignment + [(var, value)], size) for value in values]
+
+
+# runs tasks (partial assignments of board) on workers processes with work stealing until one finds a solution
+#   (find_one), limit solutions have been found, the whole tree has been explored or max_seconds runs out
+#   returns (status, solution, count, stats): status SOLVED if a solution turned up, UNSOLVABLE if none did, TIMEOUT,
+#   and stats = {'tasks': tasks searched, 'steals': steals that got work}
+#   raises RuntimeError if a worker process dies
+def _run_stealing(board, tasks, workers, options, find_one=False, limit=None, max_seconds=None):
+    deadline = time.perf_counter() + max_seconds if max_seconds is not None else None
+    size = len(board)
+    packed = pack_board(board)
+    queue = deque(pack_assignment(task, size) for task in tasks)
+    stats = {'tasks': 0, 'steals': 0}
+    count = 0
+    connections = []
+    processes = []
+    idle = set()  # workers without a task
+    asked = set()  # workers with an unanswered steal
+    try:
+        for _ in range(workers):
+            connection, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_run_worker, args=(child, packed, options, find_one,
+                                                                        limit is not None), daemon=True)
+            process.start()
+            child.close()
+            connections.append(connection)
+            processes.append(process)
+            idle.add(connection)
+
+        while True:
+            # hand out queued tasks, then ask busy workers for work on behalf of the idle ones left
+            while idle and queue:
+                connection = idle.pop()
+                connection.send(('task', queue.popleft()))
+                stats['tasks'] += 1
+            if len(idle) == workers:  # (and nothing queued) the whole tree has been explored
+                return (SOLVED if count else UNSOLVABLE), None, count, stats
+            for connection in connections:
+                if len(asked) >= len(idle): break
+                if connection not in idle and connection not in asked:
+                    connection.send(('steal', None))
+                    asked.add(connection)
+
+            timeout = max(deadline - time.perf_counter(), 0) if deadline is not None else None
+            ready = wait(connections, timeout)
+            if not ready:
+                return TIMEOUT, None, count, stats
+            for connection in ready:
+                try:
+                    kind, content = connection.recv()
+                except EOFError:
+                    raise RuntimeError("A search worker died") from None
+                if kind == 'solution':
+                    return SOLVED, unpack_board(content), count + 1, stats
+                if kind == 'work':
+                    asked.discard(connection)
+                    if content:
+                        stats['steals'] += 1
+                        queue.extend(content)
+                    continue
+                count += content
+                if kind == 'idle':
+                    idle.add(connection)
+                if limit is not None and count >= limit:
+                    return SOLVED, None, limit, stats
+    finally:
+        for connection in connections:
+            connection.close()
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+
+
+# solves a copy of board by searching it on workers processes at once (None -> one per CPU), with work stealing
+#   returns a SolveResult like the batch API, with stats['tasks'] = subtrees searched and stats['steals'] = times an
+#   idle worker got work from a busy one
+#   subproblems = how many subtrees to split into before the search starts (default one per worker)
+#   max_seconds = wall-clock budget for the whole solve (TIMEOUT result when it runs out)
+#   other options go to every SudokuSolver (e.g. use_lcv=False); budgets per subtree aren't supported
+#   raises RuntimeError if a worker process dies
+def solve_parallel(board, workers=None, subproblems=None, max_seconds=None, **options):
+    if not is_valid_board(board):
+        return SolveResult(None, INVALID, {'time': 0.0})
+
+    start_time = time.time()
+    workers = workers or os.cpu_count() or 1
+    tasks, solutions = split_search(board, subproblems or workers, **options)
+    if solutions or not tasks:
+        status = SOLVED if solutions else UNSOLVABLE
+        return SolveResult(solutions[0] if solutions else None, status,
+                           {'tasks': 0, 'steals': 0, 'time': time.time() - start_time})
+
+    status, solution, _, stats = _run_stealing(board, tasks, workers, options, find_one=True, max_seconds=max_seconds)
+    stats['time'] = time.time() - start_time
+    return SolveResult(solution, status, stats)
+
+
+# counts the solutions of board (stopping once limit is reached, None = count them all) on workers processes at once,
+#   with work stealing; returns the count like SudokuSolver.count_solutions (0 for an invalid board)
+#   workers / subproblems / options as for solve_parallel
+def count_solutions_parallel(board, limit=None, workers=None, subproblems=None, **options):
+    if not is_valid_board(board):
+        return 0
+
+    workers = workers or os.cpu_count() or 1
+    tasks, solutions = split_search(board, subproblems or workers, **options)
+    count = len(solutions)
+    if limit is not None and count >= limit:
+        return limit
+    if tasks:
+        count += _run_stealing(board, tasks, workers, options, limit=limit - count if limit is not None else None)[2]
+    return count
+
+
+# checks if board has exactly one solution with the parallel search (stops as soon as a second one turns up)
+def has_unique_solution_parallel(board, workers=None, **options):
+    return count_solutions_parallel(board, limit=2, workers=workers, **options) == 1
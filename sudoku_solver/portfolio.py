@@ -0,0 +1,88 @@
+#
+# Portfolio solving: races several differently configured CSP solvers on one puzzle, each in its own process
+#   on the hardest puzzles no single configuration is fastest every time (and a randomized one can get unlucky), so
+#   running a few different ones side by side and taking whichever finishes first cuts the slow tail, at the cost of
+#   one CPU per configuration
+#   the first definitive answer (solved, or proven unsolvable) wins and the other processes are terminated
+#
+
+import multiprocessing
+from multiprocessing.connection import wait
+import random
+import time
+from .solver import SOLVED, UNSOLVABLE, INVALID
+from .batch import BatchRunner, SolveResult
+from .utils import is_valid_board, pack_board, unpack_board
+
+# default portfolio: SudokuSolver options per member ('seed' becomes the member's random.Random)
+#   the default solver, randomized restarts on two schedules (one with nogood learning), and restarts with every
+#   inference rule on (fewer nodes, but each one dearer)
+DEFAULT_PORTFOLIO = (
+    {},
+    {'restarts': 'luby', 'seed': 1},
+    {'restarts': 'geometric', 'seed': 2, 'use_nogoods': True},
+    {'restarts': 'luby', 'seed': 3, 'use_naked_pairs': True, 'use_hidden_pairs': True, 'use_locked_candidates': True},
+)
+
+
+# runs one portfolio member in its own process and sends back (packed solution or None, status, stats)
+def _run_member(connection, packed, options, budget):
+    options = dict(options)
+    if 'seed' in options:
+        options['rng'] = random.Random(options.pop('seed'))
+    result = BatchRunner('csp', **options, **budget).solve(unpack_board(packed))
+    solution = pack_board(result.solution) if result.solution is not None else None
+    connection.send((solution, result.status, result.stats))
+    connection.close()
+
+
+# solves a copy of board with every configuration of portfolio at once (one process each); returns the SolveResult
+#   of the first member to solve it or prove it unsolvable, with stats['member'] = that member's index in portfolio
+#   max_nodes / max_seconds / max_memory = budgets for each member; if every member runs out, the first one to
+#   give up is returned (TIMEOUT or BUDGET_EXCEEDED)
+#   raises RuntimeError if every member process died without an answer
+def solve_portfolio(board, portfolio=DEFAULT_PORTFOLIO, max_nodes=None, max_seconds=None, max_memory=None):
+    if not is_valid_board(board):
+        return SolveResult(None, INVALID, {'time': 0.0})
+
+    start_time = time.time()
+    budget = {key: value for key, value in
+              (('max_nodes', max_nodes), ('max_seconds', max_seconds), ('max_memory', max_memory)) if value is not None}
+    packed = pack_board(board)
+    members = {}  # receiving end of each member's pipe -> (index, process), while it hasn't answered
+    processes = []
+    try:
+        for index, options in enumerate(portfolio):
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=_run_member, args=(sender, packed, options, budget), daemon=True)
+            process.start()
+            sender.close()
+            members[receiver] = (index, process)
+            processes.append(process)
+
+        fallback = None
+        while members:
+            for receiver in wait(list(members)):
+                index, _ = members.pop(receiver)
+                try:
+                    solution, status, stats = receiver.recv()
+                except EOFError:  # the member died without an answer
+                    continue
+                finally:
+                    receiver.close()
+                stats = dict(stats, time=time.time() - start_time, member=index)
+                result = SolveResult(unpack_board(solution) if solution is not None else None, status, stats)
+                if status in (SOLVED, UNSOLVABLE):
+                    return result
+                if fallback is None:
+                    fallback = result
+        if fallback is None:
+            raise RuntimeError("Every portfolio member failed without an answer")
+        return fallback
+    finally:
+        for receiver in members:
+            receiver.close()
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
@@ -1,4 +1,7 @@
+import bz2
+import gzip
 import os
+import sys
 
 # loads puzzle from text files (either HARD or EASY puzzle)
 def load_puzzle(filename):
@@ -22,4 +25,65 @@ def get_easy_puzzle():
 def get_hard_puzzle():
     return load_puzzle('hard_sudoku.txt')
 
-__all__ = ['get_easy_puzzle', 'get_hard_puzzle']
\ No newline at end of file
+# characters for the values of a cell, in order: blank, then 1-9, then letters for 10 and up (16x16 and 25x25 boards)
+CELL_CHARS = '0123456789ABCDEFGHIJKLMNOP'
+
+# value of every character a puzzle line may hold ('.' is a blank too, letters can be lower case)
+CHAR_VALUES = {char: value for value, char in enumerate(CELL_CHARS)}
+CHAR_VALUES.update({char.lower(): value for char, value in CHAR_VALUES.items()})
+CHAR_VALUES['.'] = 0
+
+# converts one line of the standard one-puzzle-per-line format into a 2-dim board
+#   81 characters read row by row, digits 1-9 for givens and '0' or '.' for blanks
+#   other board sizes work the same way, sized by the line's length: 16 characters for 4x4, 256 for 16x16 and 625 for
+#   25x25, with the letters A, B, C, ... standing for 10, 11, 12, ...
+#   anything after the puzzle (separated by whitespace or a comma, e.g. a rating or a solution) is ignored
+def parse_puzzle_line(line):
+    fields = line.replace(',', ' ').split()
+    text = fields[0] if fields else ''
+    size = int(round(len(text) ** 0.5))
+    box_size = int(round(size ** 0.5))
+    if box_size < 2 or box_size ** 4 != len(text):
+        raise ValueError(f"Not a puzzle line (81 characters for 9x9): {line.strip()!r}")
+    values = [CHAR_VALUES.get(char, -1) for char in text]
+    if any(not 0 <= value <= size for value in values):
+        raise ValueError(f"Not a {size}x{size} puzzle line: {line.strip()!r}")
+    return [values[row * size:(row + 1) * size] for row in range(size)]
+
+# converts a board back into one line of the one-puzzle-per-line format ('.' for blanks)
+def format_puzzle_line(board):
+    return ''.join(CELL_CHARS[value] if value else '.' for row in board for value in row)
+
+# opens a puzzle collection for reading as text: '-' means stdin, gzip/bz2 files are recognized by their first bytes
+def open_puzzle_file(path):
+    if path == '-':
+        return sys.stdin
+    with open(path, 'rb') as file:
+        magic = file.read(3)
+    if magic[:2] == b'\x1f\x8b':
+        return gzip.open(path, 'rt')
+    if magic == b'BZh':
+        return bz2.open(path, 'rt')
+    return open(path, 'r')
+
+# lazily yields boards from a collection with one puzzle per line (e.g. the 17-clue and hardest-puzzle lists)
+#   source = file path ('-' for stdin, may be gzip/bz2 compressed) or an already open text file
+#   only one line is held at a time, so files with millions of puzzles are read in constant memory
+#   blank lines and lines starting with '#' are skipped
+def iter_puzzles(source):
+    if isinstance(source, (str, bytes, os.PathLike)):
+        file = open_puzzle_file(source)
+        close = file is not sys.stdin
+    else:
+        file, close = source, False
+    try:
+        for line_number, line in enumerate(file, 1):
+            if not line.strip() or line.lstrip().startswith('#'): continue
+            try:
+                yield parse_puzzle_line(line)
+            except ValueError as error:
+                raise ValueError(f"Line {line_number}: {error}") from None
+    finally:
+        if close: file.close()
+
+__all__ = ['get_easy_puzzle', 'get_hard_puzzle', 'iter_puzzles', 'parse_puzzle_line', 'format_puzzle_line']
\ No newline at end of file
@@ -0,0 +1,132 @@
+#
+# Packed binary puzzle corpus: fixed-width records behind a small header, read through mmap
+#   puzzle N sits at a known offset, so any process can jump straight to it (or to a range of records)
+#   without parsing text, and every process reading the same file shares the same page-cache memory
+#
+#   layout: 32-byte header, then one record per puzzle, cells row by row
+#     'nibble' records: two cells per byte (high nibble first), 41 bytes for a 9x9 board
+#     'byte' records: one cell per byte, 81 bytes for a 9x9 board (same bytes as utils.pack_board)
+#
+
+import mmap
+import struct
+from ..utils import unpack_board
+
+MAGIC = b'SDKC'
+VERSION = 1
+
+# magic, version, box size, encoding (0 = nibble, 1 = byte), record size in bytes, number of records, reserved
+HEADER = struct.Struct('<4sBBBxIQ12x')
+
+ENCODINGS = {'nibble': 0, 'byte': 1}
+
+# each byte of a nibble record expanded to its two cell values
+NIBBLE_PAIRS = [bytes((byte >> 4, byte & 0x0F)) for byte in range(256)]
+
+
+# size of one record in bytes for a box size and encoding
+def record_size(box_size, encoding):
+    num_cells = box_size ** 4
+    return (num_cells + 1) // 2 if encoding == 'nibble' else num_cells
+
+
+# packs one board into a record
+def encode_record(board, encoding):
+    cells = bytes(value for row in board for value in row)
+    if encoding == 'byte':
+        return cells
+    if len(cells) % 2:
+        cells += b'\x00'
+    return bytes((cells[i] << 4) | cells[i + 1] for i in range(0, len(cells), 2))
+
+
+# writes puzzles (any iterable of boards, consumed lazily) to a corpus file; returns the number of records written
+#   'nibble' only fits values up to 15, so it's only for boards up to 9x9
+def write_corpus(path, puzzles, box_size=3, encoding='nibble'):
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown corpus encoding: {encoding}")
+    size = box_size * box_size
+    if encoding == 'nibble' and size > 15:
+        raise ValueError("Nibble records only fit values up to 15")
+
+    count = 0
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, box_size, ENCODINGS[encoding], record_size(box_size, encoding), 0))
+        for board in puzzles:
+            if len(board) != size or any(len(row) != size for row in board):
+                raise ValueError(f"Puzzle {count} is not a {size}x{size} board")
+            file.write(encode_record(board, encoding))
+            count += 1
+        # the count goes into the header last, once it is known
+        file.seek(0)
+        file.write(HEADER.pack(MAGIC, VERSION, box_size, ENCODINGS[encoding], record_size(box_size, encoding), count))
+    return count
+
+
+# read-only, memory-mapped view of a corpus file: len(corpus), corpus[n] -> board, corpus.packed(n) -> packed bytes
+class Corpus:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            header = self.file.read(HEADER.size)
+            if len(header) != HEADER.size:
+                raise ValueError(f"{path} is not a puzzle corpus (file too short)")
+            magic, version, self.box_size, encoding, self.record_size, self.count = HEADER.unpack(header)
+            if magic != MAGIC or version != VERSION or encoding not in ENCODINGS.values():
+                raise ValueError(f"{path} is not a puzzle corpus (bad header)")
+            self.encoding = 'nibble' if encoding == ENCODINGS['nibble'] else 'byte'
+            self.num_cells = self.box_size ** 4
+            if self.record_size != record_size(self.box_size, self.encoding):
+                raise ValueError(f"{path} is not a puzzle corpus (bad record size)")
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(self.map) < HEADER.size + self.count * self.record_size:
+                raise ValueError(f"{path} is truncated")
+        except Exception:
+            self.file.close()
+            raise
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        return unpack_board(self.packed(index))
+
+    def __iter__(self):
+        return self.boards()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    # byte offset of record n in the file
+    def offset(self, index):
+        if index < 0: index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("corpus index out of range")
+        return HEADER.size + index * self.record_size
+
+    # raw record n, as a view into the mapped file (no copy; release it before closing the corpus)
+    def record(self, index):
+        start = self.offset(index)
+        return memoryview(self.map)[start:start + self.record_size]
+
+    # record n as packed board bytes (one byte per cell, same format as utils.pack_board)
+    def packed(self, index):
+        start = self.offset(index)
+        record = self.map[start:start + self.record_size]
+        if self.encoding == 'byte':
+            return record
+        return b''.join([NIBBLE_PAIRS[byte] for byte in record])[:self.num_cells]
+
+    # yields the boards of records start..stop-1 (the whole corpus by default)
+    def boards(self, start=0, stop=None):
+        stop = self.count if stop is None else min(stop, self.count)
+        for index in range(start, stop):
+            yield self[index]
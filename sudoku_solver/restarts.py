@@ -0,0 +1,39 @@
+#
+# Restart schedules for the CSP solver (SudokuSolver(board, restarts='luby' or 'geometric'))
+#   search times on hard puzzles are heavy-tailed: an unlucky early choice can leave the search stuck in a huge
+#   subtree that a different ordering would never enter; cutting each run off after a number of nodes and starting
+#   over with new random tie-breaks bounds how long any one bad ordering can hold it up
+#   a schedule is an endless sequence of node cutoffs, in units of the solver's restart_base
+#
+
+# restart strategies selectable by name
+RESTART_STRATEGIES = ('luby', 'geometric')
+
+# nodes per unit of a restart schedule (the first run's cutoff)
+RESTART_BASE = 100
+
+# growth of the geometric schedule from one run to the next
+GEOMETRIC_FACTOR = 1.5
+
+
+# i-th term (from 1) of the Luby sequence: 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8, ...
+#   within a constant factor of the best possible fixed schedule for any run-time distribution (Luby et al., 1993)
+def luby(i):
+    while True:
+        power = 1
+        while power * 2 - 1 < i:
+            power *= 2
+        if power * 2 - 1 == i:
+            return power
+        i -= power - 1
+
+
+# endless node cutoffs: base * luby(1), base * luby(2), ... for 'luby', base * GEOMETRIC_FACTOR ** k for 'geometric'
+def restart_schedule(strategy, base=RESTART_BASE):
+    run = 1
+    while True:
+        if strategy == 'luby':
+            yield base * luby(run)
+        else:
+            yield int(base * GEOMETRIC_FACTOR ** (run - 1))
+        run += 1
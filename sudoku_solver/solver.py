@@ -1,132 +1,609 @@
 #
 # Main solver of sudoku boards, using various CSP techniques
-# Implements: conflict-directed backjumping, forward checking, AC3, LCV, and MRV
+# Implements: conflict-directed backjumping, forward checking, AC3, LCV, and MRV (and optionally nogood learning)
 #
 
 from collections import deque
+import random
 import time
-import copy
-from .utils import validate_solution, is_valid_board
+from .utils import validate_solution, is_valid_board, board_box_size
+from .domains import DOMAIN_BACKENDS, TIMED_BACKENDS
+from .geometry import get_geometry
+from .inference import INFERENCE_RULES, run_pipeline
+from .stats import SearchStats
+from .budget import Budget
+from .cache import canonical_key, encode_solution, decode_solution, UNSOLVABLE_ENTRY
+from .nogoods import NogoodStore, MAX_NOGOODS, explain
+from .restarts import RESTART_STRATEGIES, RESTART_BASE, restart_schedule
+
+# outcomes of a solve (reported by the batch API)
+SOLVED = 'solved'
+UNSOLVABLE = 'unsolvable'
+INVALID = 'invalid'
+TIMEOUT = 'timeout'  # max_seconds ran out before the search finished
+BUDGET_EXCEEDED = 'budget_exceeded'  # max_nodes or max_memory ran out before the search finished
 
 # main solver class: initialize the sudoku solver for board
+#   cells are referred to by flat index (row * size + col); the caller's board is kept in sync on every assignment
+#   any N^2 x N^2 board works (4x4, the standard 9x9, 16x16, 25x25, ...): the geometry tables and domains are sized
+#   for the board the solver is created with, and later boards given to reset must have the same size
 class SudokuSolver:
-    def __init__(self, board, use_mrv=True, use_forward_checking=True, use_ac3=True, use_lcv=True):
+    def __init__(self, board, use_mrv=True, use_forward_checking=True, use_ac3=True, use_lcv=True,
+                 use_incremental_ac3=True, use_naked_singles=True, use_hidden_singles=True, use_naked_pairs=False,
+                 use_hidden_pairs=False, use_locked_candidates=False, domain_backend='bitmask', rng=None,
+                 collect_stats=False, cache=None, use_nogoods=False, max_nogoods=MAX_NOGOODS, restarts=None,
+                 restart_base=RESTART_BASE):
+        if domain_backend not in DOMAIN_BACKENDS:
+            raise ValueError(f"Unknown domain backend: {domain_backend}")
+        if restarts is not None and restarts not in RESTART_STRATEGIES:
+            raise ValueError(f"Unknown restart strategy: {restarts}")
         if not is_valid_board(board):
             raise ValueError("Invalid Sudoku board")
             
-        self.board = board
-        self.size = 9
-        self.box_size = 3
+        self.box_size = board_box_size(board)
+        self.size = self.box_size * self.box_size
         self.empty = 0
+
+        # shared precomputed units/peers tables
+        self.geometry = get_geometry(self.box_size)
+        self.peers = self.geometry.peers
         
         # set solving flags (user has opportunity to turn these off, but they are defaulted ON)
+        #   except the pair and locked-candidate rules: they only pay for their cost on the hardest puzzles
         self.use_mrv = use_mrv
         self.use_forward_checking = use_forward_checking
         self.use_ac3 = use_ac3
         self.use_lcv = use_lcv
+        self.use_incremental_ac3 = use_incremental_ac3
+        self.use_naked_singles = use_naked_singles
+        self.use_hidden_singles = use_hidden_singles
+        self.use_naked_pairs = use_naked_pairs
+        self.use_hidden_pairs = use_hidden_pairs
+        self.use_locked_candidates = use_locked_candidates
+        self.inference_rules = [rule for flag, rule in INFERENCE_RULES if getattr(self, flag)]
+        self.domain_backend = domain_backend
+
+        # random.Random instance: if given, MRV ties are broken at random and values are tried in random order (LCV, if
+        #   on, still decides first)
+        #   restarts need the randomness, so they bring their own (seeded, so runs can be repeated) if none is given
+        self.rng = rng if rng is not None or restarts is None else random.Random(0)
+
+        # restart strategy for solve ('luby', 'geometric' or None, see restarts.py): the search starts over after a
+        #   number of nodes that grows from restart_base along the schedule
+        self.restarts = restarts
+        self.restart_base = restart_base
+
+        # search statistics (SearchStats), or None when collect_stats is off so the counters cost nothing
+        self.stats = SearchStats() if collect_stats else None
+
+        # solution cache consulted by solve (SolutionCache or anything with the same get/put), or None
+        self.cache = cache
+
+        # nogood learning (see nogoods.py): learned nogoods, the trail position of every assignment (to explain
+        #   reductions with), and (trail position, cells) of every value pruned by a nogood
+        self.nogoods = NogoodStore(self.geometry.num_cells, self.size, max_nogoods) if use_nogoods else None
+        self.assignment_marks = []
+        self.nogood_reasons = {}
+        self.learning = False
         
-        # initialize domains and conflict set tracking 
-        self.domains = self.initialize_domains()
+        # solver buffers: flat copy of the board (so peer lookups don't need row/col math) and of its starting values,
+        #   domains, conflict set tracking
+        #   filled in for a board by reset, and reused as-is if the solver is reset with another board
+        self.grid = [self.empty] * self.geometry.num_cells
+        self.givens = [self.empty] * self.geometry.num_cells
+        self.domains = (TIMED_BACKENDS if use_nogoods else DOMAIN_BACKENDS)[domain_backend](self.size)
         self.conflict_sets = {}
+        self.conflict_trail = []
         self.assignment_order = []
+        self.stack = []
+        self.reset(board)
+
+    # loads a board into the solver (the board gets solved in place)
+    #   clears and refills the existing buffers instead of allocating new ones, so one solver can work through many puzzles
+    def reset(self, board):
+        if not is_valid_board(board):
+            raise ValueError("Invalid Sudoku board")
+        size = self.size
+        if len(board) != size:
+            raise ValueError(f"Board is {len(board)}x{len(board)}, but the solver was set up for {size}x{size} boards")
+
+        self.board = board
+        for row in range(size):
+            self.grid[row * size:(row + 1) * size] = board[row]
+        self.givens[:] = self.grid
+        self.clashing_givens = self.find_clashing_givens()
+        self.conflict_sets.clear()
+        self.conflict_trail.clear()
+        self.assignment_order.clear()
+        self.stack.clear()
+        if self.nogoods is not None:
+            self.nogoods.clear()
+            self.assignment_marks.clear()
+            self.nogood_reasons.clear()
+        self.search_done = False
+        self.cancelled = False
+        self.status = None  # outcome of the last solve (SOLVED, UNSOLVABLE, TIMEOUT or BUDGET_EXCEEDED)
+        if self.stats is not None:
+            self.stats.clear()
+        self.initialize_domains()
 
-    # initialize domain for all empty cells: this is [1-9] to start, all viable values a sudoku blank space can take
+    # checks the givens against each other: TRUE if a given shares its value with a peer (e.g. two 5s in one row)
+    #   is_valid_board only checks the board's shape and value range, and the domains of the empty cells can't show
+    #   such a clash, so without this check the search would look for a solution that can't exist
+    def find_clashing_givens(self):
+        grid = self.grid
+        for var, value in enumerate(grid):
+            if value != self.empty and any(grid[peer] == value for peer in self.peers[var]):
+                return True
+        return False
+
+    # initialize domain for all empty cells: this is [1-9] to start (on a 9x9 board), all viable values a sudoku blank
+    #   space can take
+    #   domains are kept in the selected backend ('set' = dict of sets, 'bitmask' = flat list of size-bit masks)
     def initialize_domains(self):
-        domains = {}
-        for i in range(self.size):
-            for j in range(self.size):
-                if self.board[i][j] == self.empty:
-                    domains[(i, j)] = set(range(1, 10))
-                    self.update_domain((i, j), domains)
+        domains = self.domains
+        domains.clear()
+        values = range(1, self.size + 1)
+        for var, value in enumerate(self.grid):
+            if value == self.empty:
+                domains.add(var, values)
+                self.update_domain(var, domains)
         return domains
 
     # update domain of a board position based on the current state (set of valid values an empty square can take: starts as [1-9])
-    #   removes values that would violate Sudoku rules
-    def update_domain(self, pos, domains):
-        if pos not in domains: return
-        row, col = pos
-        # remove values seen in row
-        for j in range(self.size):
-            if self.board[row][j] != self.empty:
-                domains[pos].discard(self.board[row][j])
-                
-        # remove values seen in column
-        for i in range(self.size):
-            if self.board[i][col] != self.empty:
-                domains[pos].discard(self.board[i][col])
-                
-        # remove values seen in 3x3 box
-        box_row, box_col = 3 * (row // 3), 3 * (col // 3)
-        for i in range(box_row, box_row + 3):
-            for j in range(box_col, box_col + 3):
-                if self.board[i][j] != self.empty:
-                    domains[pos].discard(self.board[i][j])
+    #   removes values that would violate Sudoku rules, i.e. any value already placed in its row, column or 3x3 box
+    def update_domain(self, var, domains):
+        if var not in domains: return
+        grid = self.grid
+        for peer in self.peers[var]:
+            if grid[peer] != self.empty:
+                domains.discard(var, grid[peer])
 
     # main solving method using extra techniques; returns TRUE if solution is found, FALSE otherwise
-    def solve(self):
+    #   optional budgets: max_nodes search nodes, max_seconds of wall-clock time, max_memory bytes of process memory
+    #   if one runs out first, the search is abandoned (the board is back to its starting values) and solve returns
+    #   None, with self.status = TIMEOUT (time) or BUDGET_EXCEEDED (nodes, memory); self.stats keeps the partial counts
+    #   with a cache, the puzzle's canonical form is looked up first, and the outcome of a search is stored in it
+    def solve(self, max_nodes=None, max_seconds=None, max_memory=None):
+        if self.cache is None:
+            return self.search_with_budget(max_nodes, max_seconds, max_memory)
+
+        key, transform = canonical_key(self.board)
+        entry = self.cache.get(key)
+        if entry is not None:
+            return self.load_cached(entry, transform)
+        result = self.search_with_budget(max_nodes, max_seconds, max_memory)
+        if result is not None:  # (a search cut short by its budget says nothing about the puzzle)
+            self.cache.put(key, encode_solution(self.board, transform) if result else UNSOLVABLE_ENTRY)
+        return result
+
+    # the search behind solve (same arguments and results), without the cache
+    def search_with_budget(self, max_nodes=None, max_seconds=None, max_memory=None):
+        budget = Budget(max_nodes, max_seconds, max_memory)
+        if not self.start_search_within(budget):
+            self.status = UNSOLVABLE
+            return False
+
+        if self.restarts is not None:
+            result = self.run_with_restarts(budget)
+        elif max_nodes is None and max_seconds is None and max_memory is None:
+            result = self.run_search()
+        else:
+            result = self.run_with_budget(budget)
+        if result is not None:
+            self.status = SOLVED if result else UNSOLVABLE
+        return result
+
+    # fills the board from a cached entry (mapped back from the canonical form); returns like solve
+    def load_cached(self, entry, transform):
+        self.search_done = True
+        if entry == UNSOLVABLE_ENTRY:
+            self.status = UNSOLVABLE
+            return False
+        solution = decode_solution(entry, transform)
+        size = self.size
+        for var, value in enumerate(self.grid):
+            if value == self.empty:
+                self.set_value(var, solution[var // size][var % size])
+                self.domains.remove(var)
+        self.status = SOLVED
+        return True
+
+    # start_search under a budget: the root frame is a search node like any other (stats.nodes counts it), so it is
+    #   charged against max_nodes too
+    def start_search_within(self, budget):
+        if not self.start_search(): return False
+        budget.spend(len(self.stack))
+        return True
+
+    # runs the search in slices of a few nodes, checking the budget in between (see budget.py)
+    #   returns like run_search, or None after cancelling the search once a limit runs out (and setting self.status)
+    def run_with_budget(self, budget):
+        while True:
+            size = budget.next_slice()
+            result = self.run_search(size)
+            if result is not None or self.cancelled: return result
+            budget.spend(size)
+            if self.out_of_budget(budget): return None
+
+    # runs the search with restarts: each run stops after the next cutoff of the restart schedule, is undone, and the
+    #   search starts over from the root (with different random tie-breaks; learned nogoods are kept)
+    #   the budget covers every run together; returns like run_with_budget
+    def run_with_restarts(self, budget):
+        for cutoff in restart_schedule(self.restarts, self.restart_base):
+            used = 0
+            while used < cutoff:
+                size = budget.next_slice(cutoff - used)
+                result = self.run_search(size)
+                if result is not None or self.cancelled: return result
+                budget.spend(size)
+                used += size
+                if self.out_of_budget(budget): return None
+            self.cancel_search()
+            if self.stats is not None:
+                self.stats.restarts += 1
+            if not self.start_search_within(budget): return False
+
+    # checks the budget after a slice of the search; if a limit has run out, cancels the search, sets self.status
+    #   and returns TRUE
+    def out_of_budget(self, budget):
+        exceeded = budget.exceeded()
+        if exceeded is None: return False
+        self.cancel_search()
+        self.status = TIMEOUT if exceeded == 'seconds' else BUDGET_EXCEEDED
+        return True
+
+    # counts the board's solutions, stopping early once limit is reached (limit=None counts them all)
+    #   runs the same search (and propagation) as solve, resuming it after every solution; the board is left
+    #   with its starting values afterwards
+    #   starts from the givens even if solve already ran (or filled the board in from the cache)
+    def count_solutions(self, limit=None):
+        self.restore_givens()
+        count = 0
+        if self.start_search():
+            while (limit is None or count < limit) and self.run_search():
+                count += 1
+        self.cancel_search()
+        return count
+
+    # puts the board back to its starting values and domains: undoes the frames of a search still on the stack and
+    #   clears the cells a cache hit filled in (learned nogoods and stats are kept)
+    def restore_givens(self):
+        self.cancel_search()
+        for var, value in enumerate(self.givens):
+            if self.grid[var] != value:
+                self.set_value(var, value)
+        if self.nogoods is not None:
+            self.nogood_reasons.clear()
+        self.initialize_domains()
+
+    # checks if the board has exactly one solution (stops as soon as a second one turns up)
+    def has_unique_solution(self):
+        return self.count_solutions(limit=2) == 1
+
+    # sets up a new search: root propagation (AC-3 and inference rules if enabled), then the root frame on the stack
+    #   returns FALSE if propagation alone shows there is no solution (or two givens clash)
+    #   (call on a freshly reset solver)
+    def start_search(self):
+        self.stack.clear()
+        self.search_done = False  # TRUE once the whole tree has been explored (or the search was cancelled)
+        self.cancelled = False
+        if self.clashing_givens:
+            self.search_done = True
+            return False
+        self.learning = self.nogoods is not None  # (stops at the first solution, see search_loop)
+
+        stats = self.stats
+        if stats is not None:
+            start_time = time.perf_counter()
+        conflicts = self.propagate()
+        if stats is not None:
+            stats.times['propagation'] += time.perf_counter() - start_time
+        if conflicts is not None:
+            self.search_done = True
+            return False
+
+        var = self.get_next_variable()
+        if var is not None:  # (no variable left = propagation already solved the board; run_search reports it)
+            self.stack.append(self.new_frame(var))
+            if stats is not None:
+                stats.nodes += 1
+                stats.max_depth = max(stats.max_depth, 1)
+        return True
+
+    # root propagation on the starting domains: AC-3 and the unit-level inference rules, if enabled
+    #   returns NONE if successful, set of conflicting cells if it shows there is no solution
+    def propagate(self):
         # AC-3 if enabled
         if self.use_ac3:
+            mark = self.domains.mark()
             initial_conflicts = self.ac3_with_conflicts()
-            if initial_conflicts is not None: return False
-        
-        # primary solving algorithm with conflict-directed backjumping
-        success, _ = self.backtrack_with_conflicts()
-        return success
+            if self.stats is not None and self.domains.mark() != mark:
+                self.stats.pruned['ac3'] += self.domains.mark() - mark
+            if initial_conflicts is not None: return initial_conflicts
 
-    # conflict-direted backjumping function; returns success (T or F) and conflict set
-    def backtrack_with_conflicts(self, depth=0):
-        var = self.get_next_variable()
-        if var is None:  # solution found
-            return True, set()
+        # unit-level inference rules if any are enabled
+        if self.inference_rules:
+            return self.run_inference()
+        return None
 
-        row, col = var
-        current_conflicts = set()
-        
-        for value in self.get_ordered_values(var):
-            if self.is_safe(var, value):
-                # save state for backtracking
-                old_domains = copy.deepcopy(self.domains)
-                old_conflicts = copy.deepcopy(self.conflict_sets)
-                
-                # make assignment to blank spot
-                self.board[row][col] = value
-                self.assignment_order.append(var)
-                del self.domains[var]
-
-                # forward checking
-                if self.use_forward_checking:
-                    fc_conflicts = self.forward_check_with_conflicts(var, value)
-                    if fc_conflicts is not None:
-                        current_conflicts.update(fc_conflicts - {var})
-                        self.restore_state(var, old_domains, old_conflicts)
-                        continue
+    # a search frame for var: [variable, iterator over its remaining values, trail mark of the value currently
+    #   assigned (None if none), conflict set collected from the values tried so far]
+    def new_frame(self, var):
+        return [var, iter(self.get_ordered_values(var)), None, set()]
+
+    # primary solving algorithm with conflict-directed backjumping, run as a loop over an explicit stack of frames
+    #   (one per assigned cell) instead of one recursive call per cell, which avoids python frame overhead and lets
+    #   the search stop and pick up again where it left off
+    #   returns TRUE when a solution is found (it is written into the board), FALSE once the whole tree is explored,
+    #   or None if it stopped early (max_nodes new nodes expanded, or the search was cancelled)
+    #   after a TRUE result, calling run_search again resumes the search and looks for the next solution
+    #   with nogood learning, a frame that runs out of values records its conflict set as a nogood and the search jumps
+    #   straight back to the deepest cell in it; after a solution has been found, frames above it no longer failed
+    #   outright, so learning stops and the search backs up one frame at a time again
+    def run_search(self, max_nodes=None):
+        if self.stats is None:
+            return self.search_loop(max_nodes)
+        start_time = time.perf_counter()
+        try:
+            return self.search_loop(max_nodes)
+        finally:
+            self.stats.times['search'] += time.perf_counter() - start_time
+
+    # the search loop behind run_search (same arguments and results)
+    def search_loop(self, max_nodes=None):
+        stack = self.stack
+        if not stack:
+            if self.cancelled: return None
+            if self.search_done: return False
+            self.search_done = True  # board was already complete after root propagation
+            return True
+
+        stats = self.stats
+        learning = self.learning
+        retreat = 0  # frames popped since the last new value was tried (for the backjump distances)
+        nodes = 0
+        while stack:
+            if self.cancelled: return None
+            if max_nodes is not None and nodes >= max_nodes: return None
+
+            frame = stack[-1]
+            var, values, mark, current_conflicts = frame
+
+            # undo the value this frame tried last (its subtree failed, or its solution was already reported)
+            if mark is not None:
+                self.restore_state(var, mark)
+                frame[2] = None
 
-                # AC-3
-                if self.use_ac3:
-                    ac3_conflicts = self.ac3_with_conflicts()
-                    if ac3_conflicts is not None:
-                        current_conflicts.update(ac3_conflicts - {var})
-                        self.restore_state(var, old_domains, old_conflicts)
+            # move on to the next value that survives propagation
+            for value in values:
+                if self.is_safe(var, value):
+                    # save state for backtracking (just trail positions, nothing gets copied)
+                    mark = self.save_state()
+                    conflicts = self.assign(var, value)
+                    if conflicts is not None:
+                        current_conflicts.update(conflicts - {var})
+                        self.restore_state(var, mark)
                         continue
+                    frame[2] = mark
+                    break
+                elif learning:
+                    current_conflicts.update(self.explain_removals([(var, value)]))
 
-                # recursive call
-                success, new_conflicts = self.backtrack_with_conflicts(depth + 1)
-                if success: return True, set()
+            if stats is not None and retreat and frame[2] is not None:
+                stats.backjumps[retreat] += 1
+                retreat = 0
 
-                # update conflicts and backjump
-                current_conflicts.update(new_conflicts - {var})
-                self.restore_state(var, old_domains, old_conflicts)
+            # out of values: store conflicts for this variable and backjump, passing them up to the parent frame
+            if frame[2] is None:
+                stack.pop()
+                if learning:
+                    retreat += self.learn_and_backjump(var, current_conflicts)
+                self.conflict_trail.append((var, self.conflict_sets.get(var)))
+                self.conflict_sets[var] = current_conflicts
+                if stack:
+                    stack[-1][3].update(current_conflicts - {stack[-1][0]})
+                if stats is not None:
+                    stats.backtracks += 1
+                    retreat += 1
+                continue
 
-        # store conflicts for this variable
-        self.conflict_sets[var] = current_conflicts
-        return False, current_conflicts
+            # go one level deeper
+            next_var = self.get_next_variable()
+            if next_var is None:  # solution found
+                self.learning = False
+                return True
+            stack.append(self.new_frame(next_var))
+            nodes += 1
+            if stats is not None:
+                stats.nodes += 1
+                if len(stack) > stats.max_depth: stats.max_depth = len(stack)
+
+        self.search_done = True
+        return False
+
+    # stops the search for good and undoes every assignment it made (the board is back to its starting values)
+    def cancel_search(self):
+        while self.stack:
+            var, _, mark, _ = self.stack.pop()
+            if mark is not None:
+                self.restore_state(var, mark)
+        self.cancelled = True
+        self.search_done = True
+
+    # gives away part of the search that hasn't been explored yet (for work stealing, see parallel.py): the later half
+    #   of the untried values of the shallowest frame that has any left, which this search then skips
+    #   returns (assignment, var, values): the values of the frames above that one as (cell, value) pairs, and the cell
+    #   and values given away; None if every frame is on its last value
+    #   the frame's conflict set gets every cell above it, since the values given away never failed here (so with
+    #   nogood learning, the nogood learned when the frame runs out is its whole assignment, and the search backs up
+    #   one frame from it)
+    def donate_branches(self):
+        stack = self.stack
+        for depth, frame in enumerate(stack):
+            remaining = list(frame[1])
+            if not remaining: continue
+            keep = len(remaining) // 2
+            frame[1] = iter(remaining[:keep])
+            above = [parent[0] for parent in stack[:depth]]
+            frame[3].update(above)
+            return [(cell, self.grid[cell]) for cell in above], frame[0], remaining[keep:]
+        return None
+
+    # makes an assignment to a blank spot and propagates it (forward checking, AC-3, inference rules)
+    #   returns NONE if successful, set of conflicting cells if propagation failed (the caller restores the state)
+    def assign(self, var, value):
+        self.set_value(var, value)
+        self.assignment_order.append(var)
+        mark = self.domains.mark()
+        self.domains.remove(var)
+        if self.nogoods is not None:
+            self.assignment_marks.append(mark)
+            return self.propagate_with_nogoods(var, value, mark)
+        return self.propagate_assignment(var, value, mark)
+
+    # the propagation part of assign: forward checking, AC-3, inference rules
+    #   mark = trail position from before the assignment (the inference rules only revisit what changed since)
+    def propagate_assignment(self, var, value, mark):
+        if self.stats is not None:
+            return self.propagate_with_stats(var, value, mark)
+
+        # forward checking
+        if self.use_forward_checking:
+            fc_conflicts = self.forward_check_with_conflicts(var, value)
+            if fc_conflicts is not None: return fc_conflicts
+
+        # AC-3
+        if self.use_ac3:
+            ac3_conflicts = self.ac3_with_conflicts(var)
+            if ac3_conflicts is not None: return ac3_conflicts
+
+        # unit-level inference rules
+        if self.inference_rules:
+            rule_conflicts = self.run_inference(mark)
+            if rule_conflicts is not None: return rule_conflicts
+        return None
+
+    # the propagation steps of assign, timed and counted into self.stats (only used when collect_stats is on)
+    def propagate_with_stats(self, var, value, assign_mark):
+        stats = self.stats
+        domains = self.domains
+        clock = time.perf_counter
+
+        if self.use_forward_checking:
+            start_time, mark = clock(), domains.mark()
+            fc_conflicts = self.forward_check_with_conflicts(var, value)
+            stats.record('forward_checking', clock() - start_time, domains.mark() - mark)
+            if fc_conflicts is not None:
+                stats.fc_wipeouts += 1
+                return fc_conflicts
+
+        if self.use_ac3:
+            start_time, mark = clock(), domains.mark()
+            ac3_conflicts = self.ac3_with_conflicts(var)
+            stats.record('ac3', clock() - start_time, domains.mark() - mark)
+            if ac3_conflicts is not None: return ac3_conflicts
+
+        if self.inference_rules:
+            start_time = clock()
+            rule_conflicts = self.run_inference(assign_mark)  # (reductions are counted per rule by the pipeline)
+            stats.times['inference'] += clock() - start_time
+            if rule_conflicts is not None: return rule_conflicts
+        return None
+
+    # assign's propagation with nogood learning on: the nogoods watching the new assignment first (a violated one
+    #   fails it straight away, others may prune values), then the usual propagation
+    #   a failure is returned with a sound conflict set (see explain_conflict)
+    def propagate_with_nogoods(self, var, value, mark):
+        pruned = []
+        violated = self.nogoods.assign(var, value, self.grid, self.domains, pruned)
+        stats = self.stats
+        if violated is not None:
+            if stats is not None:
+                stats.nogood_conflicts += 1
+            return violated.cells()
+        wipeout = False
+        for cell, pruned_value, position, nogood in pruned:
+            self.nogood_reasons[cell, pruned_value] = (position, nogood.cells() - {cell})
+            if self.domains.count(cell) == 0: wipeout = True
+        if stats is not None and pruned:
+            stats.pruned['nogoods'] += len(pruned)
+        if wipeout or self.propagate_assignment(var, value, mark) is not None:
+            return self.explain_conflict()
+        return None
+
+    # the assigned cells whose values imply that every (cell, value) in removals is ruled out (see nogoods.explain)
+    def explain_removals(self, removals):
+        return explain(removals, self.domains, self.grid, self.geometry, self.assignment_order, self.assignment_marks,
+                       self.nogood_reasons)
+
+    # conflict set of a failed propagation, built from the dead end it left behind: a cell with no values left, or a
+    #   unit with no place left for a value it still needs (every assigned cell if neither turns up)
+    def explain_conflict(self):
+        domains = self.domains
+        values = range(1, self.size + 1)
+        for cell in domains:
+            if domains.count(cell) == 0:
+                return self.explain_removals([(cell, value) for value in values])
+        grid = self.grid
+        for unit in self.geometry.units:
+            missing = set(values).difference(grid[cell] for cell in unit)
+            for cell in unit:
+                if cell in domains:
+                    missing.difference_update(domains.values(cell))
+            if missing:
+                value = missing.pop()
+                conflicts = self.explain_removals([(cell, value) for cell in unit if cell in domains])
+                decided = set(self.assignment_order)
+                conflicts.update(cell for cell in unit if cell in decided)
+                return conflicts
+        return set(self.assignment_order)
+
+    # a frame ran out of values: completes its conflict set with the reasons its cell's other values were ruled out
+    #   before it was branched on, records the set as a nogood, and undoes the frames above it whose cells aren't in
+    #   it (they had no part in the dead end, so their other values would fail the same way)
+    #   returns the number of frames skipped
+    def learn_and_backjump(self, var, conflicts):
+        domains = self.domains
+        conflicts.update(self.explain_removals([(var, value) for value in range(1, self.size + 1)
+                                                if not domains.has(var, value)]))
+        depth = {cell: index for index, cell in enumerate(self.assignment_order)}
+        cells = sorted(conflicts, key=depth.__getitem__, reverse=True)
+        if self.nogoods.add([(cell, self.grid[cell]) for cell in cells]) is not None and self.stats is not None:
+            self.stats.nogoods += 1
+
+        stack = self.stack
+        skipped = 0
+        while stack and stack[-1][0] not in conflicts:
+            frame_var, _, mark, _ = stack.pop()
+            self.restore_state(frame_var, mark)
+            skipped += 1
+        return skipped
+
+    # returns the current trail positions so a move can be undone later
+    def save_state(self):
+        return self.domains.mark(), len(self.conflict_trail)
 
     # restore solver state during backtracking (undoes a move when it doesn't work out)
-    def restore_state(self, var, old_domains, old_conflicts):
-        self.board[var[0]][var[1]] = self.empty
-        self.domains = old_domains
-        self.conflict_sets = old_conflicts
+    #   rewinds the trails to the mark: costs O(changes made since then) instead of copying every domain
+    def restore_state(self, var, mark):
+        domain_mark, conflict_mark = mark
+        self.set_value(var, self.empty)
+        self.domains.undo(domain_mark)
+        while len(self.conflict_trail) > conflict_mark:
+            old_var, old_conflicts = self.conflict_trail.pop()
+            if old_conflicts is None:
+                del self.conflict_sets[old_var]
+            else:
+                self.conflict_sets[old_var] = old_conflicts
         self.assignment_order.pop()
+        if self.nogoods is not None:
+            self.assignment_marks.pop()
+
+    # writes a value into a cell (both the flat grid and the caller's 2-dim board)
+    def set_value(self, var, value):
+        self.grid[var] = value
+        self.board[var // self.size][var % self.size] = value
 
     # gets next variable if MRV is enabled
     def get_next_variable(self):
@@ -136,156 +613,153 @@ class SudokuSolver:
 
     # gets first empty cell in the board
     def get_first_empty(self):
-        for i in range(self.size):
-            for j in range(self.size):
-                if self.board[i][j] == self.empty: return (i, j)
+        for var, value in enumerate(self.grid):
+            if value == self.empty: return var
         return None
 
     # implements MRV (Minimum Remaining Values heuristic)
     #   decides WHICH cell is best to choose next
+    #   (the domain backend does the scan: set sizes for 'set', popcount lookups for 'bitmask')
+    #   with an rng, picks one of the tied cells at random instead of the first
     def get_mrv_variable(self):
-        min_length = float('inf')
-        min_var = None
-        for var in self.domains:
-            domain_length = len(self.domains[var])
-            if domain_length < min_length:
-                min_length = domain_length
-                min_var = var
-        return min_var
+        if self.rng is None:
+            return self.domains.smallest()
+        ties = self.domains.all_smallest()
+        return self.rng.choice(ties) if ties else None
 
     # gets values ordered by LCV (Least Constraining Value) if enabled
     #   chooses WHAT value to try in cell first
     #   tries values that eliminate the fewest options for other cells
     def get_ordered_values(self, var):
+        values = self.domains.values(var)
+        if self.rng is not None:
+            values = list(values)
+            self.rng.shuffle(values)  # (sorted is stable, so LCV ties keep this random order)
         if not self.use_lcv:
-            return sorted(self.domains[var])
-            
+            return values
+
+        peers = self.peers[var]
+        domains = self.domains
         def count_constraints(value):
             count = 0
-            row, col = var
-            for i in range(self.size):
-                for j in range(self.size):
-                    if (i, j) != var and self.board[i][j] == self.empty:
-                        if i == row or j == col or (i//3 == row//3 and j//3 == col//3):
-                            if value in self.domains.get((i, j), set()):
-                                count += 1
+            for peer in peers:
+                if domains.has(peer, value):
+                    count += 1
             return count
-        return sorted(self.domains[var], key=count_constraints)
+        return sorted(values, key=count_constraints)
 
     # function to run forwrd check with conflicts: returns NONE if successful, set of conflicting values if failed
     #   Immediately looks ahead and sees if a move removes all options from any remaining cell
+    #   only the 20 peers of the assigned cell can be affected, so only those are visited
     def forward_check_with_conflicts(self, var, value):
         conflicts = set()
-        row, col = var
-        
-        for i in range(self.size):
-            for j in range(self.size):
-                if self.board[i][j] == self.empty:
-                    if (i == row or j == col or 
-                        (i//3 == row//3 and j//3 == col//3)):
-                        curr_pos = (i, j)
-                        self.domains.get(curr_pos, set()).discard(value)
-                        
-                        if curr_pos in self.domains and not self.domains[curr_pos]:
-                            conflicts.add(var)
-                            return conflicts
+        domains = self.domains
+        for peer in self.peers[var]:
+            if peer in domains:
+                domains.discard(peer, value)
+                if domains.count(peer) == 0:
+                    conflicts.add(var)
+                    return conflicts
         return None
 
     # AC3 implementation (with conflict tracking): returns NONE if successful, set of conflicting values if failed
     #   propagation of constraints; can detect further than one step ahead, unlike forward checking
-    def ac3_with_conflicts(self):
-        queue = deque(self.get_all_edges())
+    #   var = cell that was just assigned: with incremental AC-3 only the arcs its assignment could have broken get queued
+    #   (every other arc is still consistent: the last propagation ended at a fixpoint of AC-3 and the inference rules,
+    #   see run_inference), otherwise all edges are checked
+    #   cells = cells whose domains shrank since the last run, to queue the arcs into instead (see run_inference)
+    def ac3_with_conflicts(self, var=None, cells=None):
+        if cells is not None:
+            queue = deque(arc for cell in cells if cell in self.domains for arc in self.get_arcs_into(cell))
+        elif var is None or not self.use_incremental_ac3:
+            queue = deque(self.get_all_edges())
+        else:
+            queue = deque(self.get_arcs_into_peers(var))
+        queued = set(queue)  # arcs currently in the queue, so the same arc is never queued twice
+        domains = self.domains
         conflicts = set()
+        pushed = len(queue)  # arcs queued so far (for the stats: processed = pushed - still queued)
         
         while queue:
-            (xi, xj) = queue.popleft()
+            arc = queue.popleft()
+            queued.discard(arc)
+            (xi, xj) = arc
             
+            if domains.count(xj) > 1: continue  # xj still has 2+ values, so the arc can't remove anything
             if self.remove_inconsistent_values(xi, xj):
-                if not self.domains[xi]:
+                if domains.count(xi) == 0:
+                    if self.stats is not None:
+                        self.stats.ac3_arcs += pushed - len(queue)
                     conflicts.add(xi)
                     conflicts.add(xj)
                     return conflicts
                     
                 for xk in self.get_neighbors(xi):
                     if xk != xj:
-                        queue.append((xk, xi))
+                        arc = (xk, xi)
+                        if arc not in queued:
+                            queued.add(arc)
+                            queue.append(arc)
+                            pushed += 1
+        if self.stats is not None:
+            self.stats.ac3_arcs += pushed
         return None
 
+    # returns the arcs (xk -> peer) pointing into the unassigned peers of var
+    #   these are the only arcs that can lose support when var is assigned (forward checking shrinks the peers' domains)
+    def get_arcs_into_peers(self, var):
+        arcs = []
+        for peer in self.get_neighbors(var):
+            arcs.extend(self.get_arcs_into(peer))
+        return arcs
+
+    # returns the arcs (xk -> cell) from the unassigned peers of cell into it
+    def get_arcs_into(self, cell):
+        return [(xk, cell) for xk in self.get_neighbors(cell)]
+
+    # runs the enabled inference rules (naked/hidden singles, naked/hidden pairs, pointing/claiming) to a fixpoint
+    #   mark = trail position the domains were last at a fixpoint at (only what changed since gets revisited), None to
+    #   look at the whole board
+    #   returns NONE if successful, set of conflicting cells if failed; reductions go on the trail like any other propagation
+    #   with AC-3 on, the rules' reductions are fed back to it (arcs into the cells they shrank), and the rules run again
+    #   on whatever that removes, until neither changes anything: so propagation always ends arc consistent, which is
+    #   what incremental AC-3 assumes at the next assignment
+    #   (the naked singles rule removes exactly what AC-3 would for the not-equal arcs, so with it on there's no need)
+    def run_inference(self, mark=None):
+        domains = self.domains
+        pruned = self.stats.pruned if self.stats is not None else None
+        while True:
+            start = domains.mark()
+            conflicts = run_pipeline(self.inference_rules, domains, self.grid, self.geometry, pruned, mark)
+            if conflicts is not None or not self.use_ac3 or self.use_naked_singles or domains.mark() == start:
+                return conflicts
+            mark = domains.mark()
+            conflicts = self.ac3_with_conflicts(cells=domains.changed_since(start))
+            if pruned is not None:
+                pruned['ac3'] += domains.mark() - mark
+            if conflicts is not None or domains.mark() == mark:
+                return conflicts
+
     # returns all edges (or pairs of cells) that directly constrain each other in the puzzle
     def get_all_edges(self):
-        edges = []
-        for i in range(self.size):
-            for j in range(self.size):
-                if (i, j) in self.domains:
-                    # row edges
-                    for k in range(self.size):
-                        if k != j and (i, k) in self.domains:
-                            edges.append(((i, j), (i, k)))
-                    # column edges
-                    for k in range(self.size):
-                        if k != i and (k, j) in self.domains:
-                            edges.append(((i, j), (k, j)))
-                    # box edges
-                    box_i, box_j = 3 * (i // 3), 3 * (j // 3)
-                    for k in range(box_i, box_i + 3):
-                        for l in range(box_j, box_j + 3):
-                            if (k, l) != (i, j) and (k, l) in self.domains:
-                                edges.append(((i, j), (k, l)))
-        return edges
+        domains = self.domains
+        return [(var, peer) for var in domains for peer in self.peers[var] if peer in domains]
 
     # returns all cells that could affect( or be affected by) the value we put in a cell
     def get_neighbors(self, var):
-        neighbors = set()
-        row, col = var
-        # check row neighbors
-        for j in range(self.size):
-            if j != col and (row, j) in self.domains:
-                neighbors.add((row, j))
-        
-        # check column neighbors
-        for i in range(self.size):
-            if i != row and (i, col) in self.domains:
-                neighbors.add((i, col))
-        
-        # check box (3x3) neighbors
-        box_row, box_col = 3 * (row // 3), 3 * (col // 3)
-        for i in range(box_row, box_row + 3):
-            for j in range(box_col, box_col + 3):
-                if (i, j) != var and (i, j) in self.domains:
-                    neighbors.add((i, j))
-        
-        return neighbors
+        domains = self.domains
+        return [peer for peer in self.peers[var] if peer in domains]
 
     # removes values from a cells domain if they can't work given another cell's domain
-    #   helper for AC-3
+    #   helper for AC-3 (specialised for the not-equal constraint by the domain backend: only a singleton xj removes anything)
     def remove_inconsistent_values(self, xi, xj):
-        removed = False
-        xi_domain = self.domains[xi].copy()
-        for x in xi_domain:
-            if not any(y != x for y in self.domains[xj]):
-                self.domains[xi].remove(x)
-                removed = True
-        return removed
-
-    # checks if placing a value at a given position is a valid
-    def is_safe(self, pos, value):
-        row, col = pos
-        
-        # check the row
-        for j in range(self.size):
-            if self.board[row][j] == value:
-                return False
-        
-        # check the column       
-        for i in range(self.size):
-            if self.board[i][col] == value:
+        return self.domains.revise(xi, xj)
+
+    # checks if placing a value at a given position is a valid (no peer in its row, column or box already holds it)
+    def is_safe(self, var, value):
+        grid = self.grid
+        for peer in self.peers[var]:
+            if grid[peer] == value:
                 return False
-        
-        # check the box (3x3)
-        box_row, box_col = 3 * (row // 3), 3 * (col // 3)
-        for i in range(box_row, box_row + 3):
-            for j in range(box_col, box_col + 3):
-                if self.board[i][j] == value:
-                    return False
         # if none of these snag, then return TRUE, the placement is valid
-        return True
\ No newline at end of file
+        return True
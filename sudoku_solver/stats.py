@@ -0,0 +1,67 @@
+#
+# Search statistics for the CSP Sudoku solver
+#   filled in only when a solver is created with collect_stats=True; otherwise solver.stats is None and the hot paths
+#   skip every counter behind a single `is not None` check
+#   counts accumulate from one reset() to the next, so a count_solutions run (or a search resumed with run_search)
+#   adds up across calls
+#
+
+from collections import Counter
+
+
+# counters for one board: read them straight off the attributes, or as plain dicts with as_dict()
+#   nodes = search frames pushed (cells branched on), backtracks = frames that ran out of values (dead ends)
+#   backjumps = distance -> count: how many levels the search backed up after a dead end before it found a new value
+#     to try
+#   fc_wipeouts = assignments whose forward check emptied a peer's domain
+#   ac3_arcs = arcs taken off the AC-3 queue
+#   pruned = technique -> domain reductions it made ('forward_checking', 'ac3', or an inference rule's name)
+#     (a reduction is one trail entry: one value for most of them, a whole domain when AC-3 empties one)
+#   max_depth = deepest search stack reached
+#   restarts = times the search was cut off and started over (with a restart strategy)
+#   nogoods = nogoods learned (and kept), nogood_conflicts = assignments failed by a learned nogood (with use_nogoods;
+#     values nogoods prune are counted in pruned['nogoods'])
+#   times = phase -> seconds: 'propagation' (root AC-3 and inference rules), 'search' (all of run_search), and within
+#     the search 'forward_checking', 'ac3' and 'inference' (propagation after each assignment)
+class SearchStats:
+    def __init__(self):
+        self.clear()
+
+    # zeroes every counter
+    def clear(self):
+        self.nodes = 0
+        self.backtracks = 0
+        self.backjumps = Counter()
+        self.fc_wipeouts = 0
+        self.ac3_arcs = 0
+        self.pruned = Counter()
+        self.max_depth = 0
+        self.restarts = 0
+        self.nogoods = 0
+        self.nogood_conflicts = 0
+        self.times = Counter()
+
+    # adds one run of a propagation technique: its time and the domain reductions it made
+    def record(self, technique, seconds, reductions):
+        self.times[technique] += seconds
+        if reductions:
+            self.pruned[technique] += reductions
+
+    # the counters as a plain dict (e.g. for JSON output or for sending back from a worker process)
+    def as_dict(self):
+        return {
+            'nodes': self.nodes,
+            'backtracks': self.backtracks,
+            'backjumps': dict(self.backjumps),
+            'fc_wipeouts': self.fc_wipeouts,
+            'ac3_arcs': self.ac3_arcs,
+            'pruned': dict(self.pruned),
+            'max_depth': self.max_depth,
+            'restarts': self.restarts,
+            'nogoods': self.nogoods,
+            'nogood_conflicts': self.nogood_conflicts,
+            'times': dict(self.times),
+        }
+
+    def __repr__(self):
+        return f"SearchStats({self.as_dict()})"
@@ -0,0 +1,276 @@
+#
+# Canonical form of a board under the Sudoku symmetry group
+#   these changes map a puzzle onto an equivalent one (same number of solutions, solutions map the same way):
+#   transposing, permuting the bands (groups of 3 rows on a 9x9 board), the rows inside a band, the stacks (groups of
+#   3 columns), the columns inside a stack, and relabeling the digits
+#   the canonical form is the smallest board (read row by row) over all of those, with digits relabeled 1, 2, 3, ...
+#   in order of first appearance and blanks ranked after every digit, so equivalent boards share one canonical form
+#
+#   it is found row by row with pruning instead of trying all 2 * 6^8 row/column arrangements (on a 9x9 board; any
+#   N^2 x N^2 board works the same way): every partial arrangement that can't give the smallest next row is dropped
+#   as soon as that row is known
+#   columns are only put in order as far as the rows picked so far tell them apart: columns that have tied in every
+#   one of them (e.g. the columns of a stack holding new digits in the first row, which any order relabels into the
+#   same row) stay together in a group whose order is still open, instead of being tried in every order; a digit
+#   first seen in such a group gets its label once its column's place in the group is known
+#   boards with so many tied arrangements that this would still blow up (e.g. nearly empty boards, where whole rows
+#   tie) are left as they are: they're still a correct cache key for themselves, just not shared with their
+#   equivalents; so are boards with a digit twice in one row or column
+#
+
+from itertools import permutations, product
+
+# most partial arrangements kept at once before giving up on the canonical form
+MAX_STATES = 4096
+
+
+# one symmetry: transpose first (if transposed), then output row r / column c comes from source row rows[r] /
+#   column cols[c], and a digit d becomes relabel[d] (relabel[0] = 0 for blanks)
+#   (blanks rank after every digit when rows are compared, i.e. as size + 1)
+class Transform:
+    def __init__(self, transposed, rows, cols, relabel):
+        self.transposed = transposed
+        self.rows = rows
+        self.cols = cols
+        self.relabel = relabel
+
+    # the board this transform maps board onto (a new 2-dim list)
+    def apply(self, board):
+        if self.transposed:
+            board = [list(column) for column in zip(*board)]
+        relabel = self.relabel
+        return [[relabel[board[row][col]] for col in self.cols] for row in self.rows]
+
+    # maps a transformed board (e.g. the solution of the canonical puzzle) back onto the original frame
+    def invert(self, board):
+        size = len(self.rows)
+        original_label = [0] * (size + 1)
+        for digit, label in enumerate(self.relabel):
+            original_label[label] = digit
+        result = [[0] * size for _ in range(size)]
+        for out_row, row in enumerate(self.rows):
+            for out_col, col in enumerate(self.cols):
+                result[row][col] = original_label[board[out_row][out_col]]
+        if self.transposed:
+            result = [list(column) for column in zip(*result)]
+        return result
+
+
+# source rows that may come next, given the ones already picked in order
+#   the first row of a band can be any row of an unused band, the rest of the band's rows must follow it
+def next_lines(picked, box_size):
+    if len(picked) % box_size:
+        group = picked[-1] // box_size
+        return [line for line in range(group * box_size, (group + 1) * box_size) if line not in picked]
+    used = {line // box_size for line in picked}
+    return [line for line in range(box_size * box_size) if line // box_size not in used]
+
+
+# transform that keeps a board of the given size as it is
+def identity(size):
+    return Transform(False, tuple(range(size)), tuple(range(size)), list(range(size + 1)))
+
+
+# checks that no digit shows up twice in a row or column of a size x size board (cells = flat tuple)
+def distinct_lines(cells, size):
+    for line in range(size):
+        for values in (cells[line * size:(line + 1) * size], cells[line::size]):
+            digits = [value for value in values if value]
+            if len(set(digits)) != len(digits): return False
+    return True
+
+
+# a partial arrangement: the board (transposed or not) as a flat tuple, the source rows picked so far, and the
+#   columns as an ordered list of groups; the columns of a group have tied in every picked row, so their order is
+#   still open
+#   bases[i] = {row: label} for the picked rows whose cells in group i all held new digits: the digit whose column
+#   ends up at position p of the group gets label + p, and until then it is pending (pending[digit] = (row, column))
+#   labels[digit] = the digit's label (0 = none yet), next_label = the label the next new digit gets
+class Arrangement:
+    def __init__(self, transposed, grid, size, rows, groups, bases, labels, pending, next_label):
+        self.transposed = transposed
+        self.grid = grid
+        self.size = size
+        self.rows = rows
+        self.groups = groups
+        self.bases = bases
+        self.labels = labels
+        self.pending = pending
+        self.next_label = next_label
+
+    # (groups and their bases are replaced, never changed in place, so their lists can be copied shallowly)
+    def copy(self):
+        return Arrangement(self.transposed, self.grid, self.size, self.rows, self.groups[:], self.bases[:],
+                           self.labels[:], dict(self.pending), self.next_label)
+
+    # index of the group holding col
+    def group_of(self, col):
+        for index, group in enumerate(self.groups):
+            if col in group: return index
+
+    # replaces group index by parts (its columns split into consecutive groups, in that order): each part's pending
+    #   labels start at its offset in the group, and the digits pending in a part of one column get their labels
+    def split(self, index, parts):
+        bases = self.bases[index]
+        part_bases = []
+        offset = 0
+        for part in parts:
+            shifted = {row: label + offset for row, label in bases.items()}
+            if len(part) == 1:
+                for row, label in shifted.items():
+                    digit = self.grid[row * self.size + part[0]]
+                    self.labels[digit] = label
+                    del self.pending[digit]
+                shifted = {}
+            part_bases.append(shifted)
+            offset += len(part)
+        self.groups[index:index + 1] = parts
+        self.bases[index:index + 1] = part_bases
+
+    # smallest rank the cell of row in col can get with col first in group index: blank, the digit's label, the first
+    #   label left in a pending digit's group (the second if that is this group, where col takes the first place), or
+    #   the next label for a new digit
+    def best_rank(self, index, row, col, blank):
+        digit = self.grid[row * self.size + col]
+        if not digit: return blank
+        if self.labels[digit]: return self.labels[digit]
+        origin = self.pending.get(digit)
+        if origin is None: return self.next_label
+        home = self.group_of(origin[1])
+        return self.bases[home][origin[0]] + (home == index)
+
+    # puts col first in group index, for a cell of row with a label or a pending digit: the pending digit's column
+    #   goes first in its own group (second in this one), which fixes its label at the rank best_rank gave
+    def place(self, index, row, col):
+        origin = self.pending.get(self.grid[row * self.size + col])
+        rest = [other for other in self.groups[index] if other != col]
+        if origin is not None and origin[1] in rest:
+            rest.remove(origin[1])
+            self.split(index, [[col], [origin[1]]] + ([rest] if rest else []))
+            return
+        self.split(index, [[col]] + ([rest] if rest else []))
+        if origin is not None:
+            home = self.group_of(origin[1])
+            self.split(home, [[origin[1]], [other for other in self.groups[home] if other != origin[1]]])
+
+    # the new digits row holds in group index (one in each of its columns) take the next labels, in the order their
+    #   columns end up in
+    def label_new(self, index, row):
+        group = self.groups[index]
+        base = row * self.size
+        if len(group) == 1:
+            self.labels[self.grid[base + group[0]]] = self.next_label
+        else:
+            for col in group:
+                self.pending[self.grid[base + col]] = (row, col)
+            self.bases[index] = {**self.bases[index], row: self.next_label}
+        self.next_label += len(group)
+
+    # the finished transform: open groups keep their columns in any order (they tie in every row), which settles the
+    #   pending labels; digits that don't appear on the board take the labels left over, in order
+    def transform(self):
+        labels = self.labels[:]
+        cols = []
+        for group, bases in zip(self.groups, self.bases):
+            for position, col in enumerate(group):
+                cols.append(col)
+                for row, label in bases.items():
+                    labels[self.grid[row * self.size + col]] = label + position
+        next_label = self.next_label
+        for digit in range(1, self.size + 1):
+            if not labels[digit]:
+                labels[digit] = next_label
+                next_label += 1
+        return Transform(self.transposed, self.rows, tuple(cols), labels)
+
+
+# the ways of putting row next in a copy of arrangement, as (ranks of the row's cells, arrangement), that give a row
+#   no larger than best (None = no bound yet); there is more than one only when the row ties between orders of an
+#   open group that it tells apart
+def place_row(arrangement, row, best, blank):
+    results = []
+    work = [(arrangement.copy(), 0, [], None)]  # (arrangement, group index, ranks so far, column to put first)
+    while work:
+        current, index, ranks, forced = work.pop()
+        while index < len(current.groups):
+            if forced is not None:
+                rank = current.best_rank(index, row, forced, blank)
+                current.place(index, row, forced)
+                ranks.append(rank)
+                index += 1
+                forced = None
+            else:
+                group = current.groups[index]
+                options = [(current.best_rank(index, row, col, blank), col) for col in group]
+                rank = min(options)[0]
+                if rank == blank:
+                    ranks.extend([blank] * len(group))
+                    index += 1
+                elif rank == current.next_label:  # new digits first (in any order), then the blanks
+                    fresh = [col for option, col in options if option == rank]
+                    empty = [col for option, col in options if option != rank]
+                    current.split(index, [fresh] + ([empty] if empty else []))
+                    current.label_new(index, row)
+                    ranks.extend(range(rank, rank + len(fresh)))
+                    ranks.extend([blank] * len(empty))
+                    index += 1 + bool(empty)
+                else:
+                    ties = [col for option, col in options if option == rank]
+                    for col in ties[1:]:
+                        work.append((current.copy(), index, ranks[:], col))
+                    current.place(index, row, ties[0])
+                    ranks.append(rank)
+                    index += 1
+            if best is not None and ranks > best[:len(ranks)]: break
+        else:
+            current.rows += (row,)
+            results.append((ranks, current))
+    return results
+
+
+# returns (canonical, transform): canonical = the canonical board as a tuple of 81 values (0 for blanks, row by row),
+#   transform = a Transform mapping board onto it (if the board has symmetries, one of the several that do)
+#   if more than MAX_STATES arrangements tie along the way, returns the board itself with an identity transform
+def canonical_form(board):
+    size = len(board)
+    box_size = int(round(size ** 0.5))
+    blank = size + 1
+    cells = tuple(value for row in board for value in row)
+    if not distinct_lines(cells, size): return cells, identity(size)
+    transposed = tuple(cells[col * size + row] for row in range(size) for col in range(size))
+
+    # first row: the stacks with the most digits in it go first (each as one open group, split by place_row into
+    #   its digits and its blanks); every order of the stacks that tie is a separate arrangement
+    stacks = [list(range(stack * box_size, (stack + 1) * box_size)) for stack in range(box_size)]
+    starts = []
+    for flip, grid in ((False, cells), (True, transposed)):
+        for row in range(size):
+            filled = [sum(1 for col in stack if grid[row * size + col]) for stack in stacks]
+            ties = {}
+            for stack in sorted(range(box_size), key=lambda stack: -filled[stack]):
+                ties.setdefault(filled[stack], []).append(stack)
+            for orders in product(*(permutations(tied) for tied in ties.values())):
+                groups = [stacks[stack] for order in orders for stack in order]
+                arrangement = Arrangement(flip, grid, size, (), groups, [{}] * box_size, [0] * (size + 1), {}, 1)
+                starts.append((row, arrangement))
+
+    # then row by row: every arrangement tries each row that may come next, and only those giving the smallest are kept
+    states = None
+    for _ in range(size):
+        if states is None:
+            candidates = starts
+        else:
+            candidates = [(row, arrangement) for arrangement in states
+                          for row in next_lines(arrangement.rows, box_size)]
+        best, extended = None, []
+        for row, arrangement in candidates:
+            for ranks, placed in place_row(arrangement, row, best, blank):
+                if best is not None and ranks > best: continue
+                if best is None or ranks < best:
+                    best, extended = ranks, []
+                extended.append(placed)
+                if len(extended) > MAX_STATES: return cells, identity(size)
+        states = extended
+
+    transform = states[0].transform()
+    return tuple(value for row in transform.apply(board) for value in row), transform
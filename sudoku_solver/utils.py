@@ -2,57 +2,79 @@
 # Utility functions for CSP Sudoku solver
 #
 
+import struct
+from .geometry import get_geometry
+
+# box size of a board (3 for 9x9, 4 for 16x16, ...) from its number of rows; None if that isn't a square of 2 or more
+def board_box_size(board):
+    box_size = int(round(len(board) ** 0.5))
+    return box_size if box_size >= 2 and box_size * box_size == len(board) else None
+
 # Prints pretty version of Sudoku board
-# board = 9x9 sudoku board
+# board = NxN sudoku board (9x9, 16x16, ...), boxes separated by lines
 def print_board(board):
+    box_size = board_box_size(board) or 3
+    width = len(str(len(board)))
     for i in range(len(board)):
-        if i % 3 == 0 and i != 0:
-            print("- - - - - - - - - - - -")
+        if i % box_size == 0 and i != 0:
+            print(" ".join(["-" * width] * (len(board) + box_size)))
+        cells = []
         for j in range(len(board[0])):
-            if j % 3 == 0 and j != 0:
-                print("|", end=" ")
-            if j == 8:
-                print(board[i][j])
-            else:
-                print(str(board[i][j]) + " ", end="")
-
-# checks if board is generally valid: 9x9 and all values within 0-9 range
+            if j % box_size == 0 and j != 0:
+                cells.append("|")
+            cells.append(str(board[i][j]).rjust(width))
+        print(" ".join(cells))
+
+# checks if board is generally valid: NxN with N a square (4x4, 9x9, 16x16, 25x25, ...) and all values within 0-N range
 def is_valid_board(board):
     # checks board size
-    if len(board) != 9 or any(len(row) != 9 for row in board):
+    size = len(board)
+    if board_box_size(board) is None or any(len(row) != size for row in board):
         return False
     
     # checks value range
     for row in board:
-        if any(not isinstance(x, int) or x < 0 or x > 9 for x in row):
+        if any(not isinstance(x, int) or x < 0 or x > size for x in row):
             return False
     
     return True
 
 # tests to see if current board is a valid sudoku solution; returns True or False
+#   every row, column and box must hold each value 1-N exactly once
 def validate_solution(board):
-    # check each row for validity
-    for row in board:
-        if not all(x in row for x in range(1, 10)):
-            return False
-    
-    # check each column for validity
-    for col in range(9):
-        column = [board[row][col] for row in range(9)]
-        if not all(x in column for x in range(1, 10)):
+    if not is_valid_board(board):
+        return False
+    size = len(board)
+    values = set(range(1, size + 1))
+    cells = [value for row in board for value in row]
+    for unit in get_geometry(board_box_size(board)).units:
+        if {cells[cell] for cell in unit} != values:
             return False
-    
-    # check each 3x3 box for validity
-    for box_row in range(0, 9, 3):
-        for box_col in range(0, 9, 3):
-            box = []
-            for i in range(3):
-                for j in range(3): box.append(board[box_row + i][box_col + j])
-            if not all(x in box for x in range(1, 10)):
-                return False
     # if not false, return True
     return True
 
 # creates a deep copy of the board (so that completely independent from the original)
 def copy_board(board):
-    return [row[:] for row in board]
\ No newline at end of file
+    return [row[:] for row in board]
+
+# packs a board into a compact bytes string (one byte per cell, row by row: 81 bytes for a 9x9 board, 256 for 16x16)
+#   much cheaper to pickle/send between processes or store than nested lists
+def pack_board(board):
+    return bytes(value for row in board for value in row)
+
+# inverse of pack_board: rebuilds the 2-dim list board from packed bytes
+def unpack_board(data):
+    size = int(round(len(data) ** 0.5))
+    return [list(data[i * size:(i + 1) * size]) for i in range(size)]
+
+# packs a partial assignment ((cell, value) pairs, cell = row * size + col) of a size x size board into a compact bytes
+#   string: 2 bytes per assignment (cell * (size + 1) + value, big-endian), so a few dozen bytes describe a subtree of
+#   a search where the whole board would take size * size
+def pack_assignment(assignment, size):
+    stride = size + 1
+    return struct.pack(f'>{len(assignment)}H', *(cell * stride + value for cell, value in assignment))
+
+# inverse of pack_assignment: rebuilds the list of (cell, value) pairs
+def unpack_assignment(data, size):
+    stride = size + 1
+    return [divmod(code, stride) for code in struct.unpack(f'>{len(data) // 2}H', data)]
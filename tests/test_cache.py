@@ -0,0 +1,148 @@
+#
+# Checks for the canonical-form solution cache (symmetry.py, cache.py) on 9x9 and 16x16 boards: a board and any copy
+#   of it under a random symmetry (transpose, band/row/stack/column permutations, digit relabeling) must share one
+#   cache key, and a solution cached for one must map back onto the other as a valid solution that keeps its givens
+#   on 4x4 boards the canonical form is also checked against the smallest board over every symmetry, tried one by one
+#   run with: python -m unittest discover tests (or python -m pytest tests)
+#
+
+from itertools import permutations, product
+import random
+import unittest
+from sudoku_solver import SudokuSolver
+from sudoku_solver.cache import SolutionCache, canonical_key, encode_solution, decode_solution
+from sudoku_solver.generate import generate_puzzles
+from sudoku_solver.puzzles import get_easy_puzzle, get_hard_puzzle
+from sudoku_solver.symmetry import Transform, canonical_form
+from sudoku_solver.utils import copy_board, validate_solution
+
+# random symmetries each board is checked under
+TRANSFORMS_PER_BOARD = 6
+
+# 4x4 boards checked against every symmetry
+SMALL_BOARDS = 60
+
+
+# a random symmetry of a box_size^2 x box_size^2 board: bands and the rows inside each band shuffled, the same for
+#   stacks and columns, maybe a transpose, and the digits relabeled
+def random_transform(rng, box_size):
+    size = box_size * box_size
+    lines = []
+    for _ in range(2):
+        lines.append(tuple(group * box_size + line for group in rng.sample(range(box_size), box_size)
+                           for line in rng.sample(range(box_size), box_size)))
+    return Transform(rng.random() < 0.5, lines[0], lines[1], [0] + rng.sample(range(1, size + 1), size))
+
+
+# 16x16 puzzles: a pattern grid shuffled by a random symmetry, with about half its cells blanked out
+def large_boards(rng, count=3, box_size=4):
+    size = box_size * box_size
+    pattern = [[(box_size * (row % box_size) + row // box_size + col) % size + 1 for col in range(size)]
+               for row in range(size)]
+    boards = []
+    for _ in range(count):
+        board = random_transform(rng, box_size).apply(pattern)
+        for cell in rng.sample(range(size * size), size * size // 2):
+            board[cell // size][cell % size] = 0
+        boards.append(board)
+    return boards
+
+
+# every order of the lines (rows or columns) of a box_size^2 board that keeps its bands (or stacks) together
+def line_orders(box_size):
+    orders = []
+    for groups in permutations(range(box_size)):
+        for insides in product(permutations(range(box_size)), repeat=box_size):
+            orders.append(tuple(group * box_size + line for group, inside in zip(groups, insides) for line in inside))
+    return orders
+
+
+# the canonical form by brute force: the smallest board (blanks after every digit, digits relabeled in order of first
+#   appearance) over every transpose, row order and column order
+def smallest_form(board, box_size):
+    size = len(board)
+    orders = line_orders(box_size)
+    best = None
+    for grid in (board, [list(column) for column in zip(*board)]):
+        for rows in orders:
+            for cols in orders:
+                labels = {}
+                ranks = []
+                for row in rows:
+                    for col in cols:
+                        value = grid[row][col]
+                        ranks.append(labels.setdefault(value, len(labels) + 1) if value else size + 1)
+                if best is None or ranks < best:
+                    best = ranks
+    return tuple(0 if rank == size + 1 else rank for rank in best)
+
+
+# the cells that hold a given on board keep it in solution
+def keeps_givens(board, solution):
+    return all(value == 0 or value == solution[row][col]
+               for row, values in enumerate(board) for col, value in enumerate(values))
+
+
+class CanonicalCacheTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        rng = random.Random(7)
+        puzzles = [get_easy_puzzle(), get_hard_puzzle()]
+        puzzles.extend(puzzle for puzzle, _ in generate_puzzles(3, difficulty='hard', rng=rng))
+        cls.boards = [(board, 3) for board in puzzles] + [(board, 4) for board in large_boards(rng)]
+
+    def test_apply_then_invert(self):
+        rng = random.Random(1)
+        for board, box_size in self.boards:
+            for _ in range(TRANSFORMS_PER_BOARD):
+                transform = random_transform(rng, box_size)
+                with self.subTest(board=board, transform=vars(transform)):
+                    self.assertEqual(transform.invert(transform.apply(board)), board)
+                    _, to_canonical = canonical_form(board)
+                    self.assertEqual(to_canonical.invert(to_canonical.apply(board)), board)
+
+    def test_key_is_shared_by_symmetric_copies(self):
+        rng = random.Random(2)
+        for board, box_size in self.boards:
+            key, _ = canonical_key(board)
+            for _ in range(TRANSFORMS_PER_BOARD):
+                transform = random_transform(rng, box_size)
+                with self.subTest(board=board, transform=vars(transform)):
+                    self.assertEqual(canonical_key(transform.apply(board))[0], key)
+
+    def test_encode_then_decode(self):
+        for board, _ in self.boards:
+            with self.subTest(board=board):
+                solution = copy_board(board)
+                self.assertTrue(SudokuSolver(solution).solve())
+                _, transform = canonical_key(board)
+                self.assertEqual(decode_solution(encode_solution(solution, transform), transform), solution)
+
+    def test_hit_on_symmetric_copy(self):
+        rng = random.Random(3)
+        for board, box_size in self.boards:
+            cache = SolutionCache()
+            self.assertTrue(SudokuSolver(copy_board(board), cache=cache).solve())
+            for _ in range(TRANSFORMS_PER_BOARD):
+                copy = random_transform(rng, box_size).apply(board)
+                with self.subTest(board=board, copy=copy):
+                    hits = cache.hits
+                    solution = copy_board(copy)
+                    self.assertTrue(SudokuSolver(solution, cache=cache).solve())
+                    self.assertEqual(cache.hits, hits + 1)
+                    self.assertTrue(validate_solution(solution))
+                    self.assertTrue(keeps_givens(copy, solution))
+
+    def test_smallest_over_every_symmetry(self):
+        rng = random.Random(4)
+        grid = [[(2 * (row % 2) + row // 2 + col) % 4 + 1 for col in range(4)] for row in range(4)]
+        for _ in range(SMALL_BOARDS):
+            board = random_transform(rng, 2).apply(grid)
+            for cell in rng.sample(range(16), rng.randint(0, 12)):
+                board[cell // 4][cell % 4] = 0
+            with self.subTest(board=board):
+                self.assertEqual(canonical_form(board)[0], smallest_form(board, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+#
+# Self-check for nogood learning (use_nogoods=True): the CSP solver's solution counts must match DLXSolver's on boards
+#   with several solutions or none, across domain backends, propagation settings and restarts
+#   a learned nogood that isn't implied by the puzzle prunes real solutions, so an unsound explanation (e.g. after a
+#   change to a propagator that explain doesn't know about) shows up here as a count that is too low
+#   counts only suffer when a bad nogood happens to cut off a solution, so the learned nogoods are also checked
+#   directly (a sample of each solve's): the board with a nogood's assignments filled in must have no solution
+#   run with: python -m unittest discover tests (or python -m pytest tests)
+#
+
+import random
+import unittest
+from sudoku_solver import SudokuSolver, DLXSolver
+from sudoku_solver.generate import generate_puzzles
+from sudoku_solver.puzzles import get_easy_puzzle, get_hard_puzzle
+from sudoku_solver.utils import copy_board, validate_solution
+
+# counts are compared up to this many solutions (boards with more are skipped)
+COUNT_LIMIT = 40
+
+# perturbed boards checked per kind (several solutions / no solution), and 16x16 boards
+BOARDS_PER_KIND = 12
+LARGE_BOARDS = 4
+
+# learned nogoods checked per solve (an evenly spaced sample, since each check is a DLX search)
+CHECKED_NOGOODS = 100
+
+# solver settings the counts are checked under: propagation changes what explain has to account for
+CONFIGURATIONS = (
+    {},
+    {'domain_backend': 'set'},
+    {'use_naked_pairs': True, 'use_hidden_pairs': True, 'use_locked_candidates': True},
+    {'use_naked_singles': False, 'use_hidden_singles': False},
+    {'use_naked_singles': False, 'use_hidden_singles': False, 'use_naked_pairs': True, 'use_hidden_pairs': True,
+     'use_locked_candidates': True},
+    {'use_ac3': False, 'use_naked_singles': False, 'use_hidden_singles': False, 'domain_backend': 'set'},
+    {'use_lcv': False, 'use_incremental_ac3': False},
+)
+
+
+# puzzles with a unique solution to perturb: the bundled ones and a few generated hard ones, as (puzzle, solution)
+def source_puzzles(rng):
+    puzzles = []
+    for puzzle in (get_easy_puzzle(), get_hard_puzzle()):
+        solution = copy_board(puzzle)
+        DLXSolver(solution).solve()
+        puzzles.append((puzzle, solution))
+    puzzles.extend(generate_puzzles(4, difficulty='hard', rng=rng))
+    return puzzles
+
+
+# boards with a few solutions (some clues blanked out) and with none (a wrong value that breaks no rule added),
+#   as (board, number of solutions up to COUNT_LIMIT)
+def perturbed_boards(seed=5):
+    rng = random.Random(seed)
+    sources = source_puzzles(rng)
+    several, unsolvable = [], []
+    while len(several) < BOARDS_PER_KIND or len(unsolvable) < BOARDS_PER_KIND:
+        puzzle, solution = rng.choice(sources)
+        board = copy_board(puzzle)
+        clues = [(row, col) for row in range(9) for col in range(9) if board[row][col]]
+        for row, col in rng.sample(clues, rng.randint(1, 3)):
+            board[row][col] = 0
+        if len(unsolvable) < BOARDS_PER_KIND:
+            # a value no peer holds, but not the one the (original) solution has there
+            blanks = [(row, col) for row in range(9) for col in range(9) if not board[row][col]]
+            row, col = rng.choice(blanks)
+            solver = SudokuSolver(copy_board(board))
+            values = [value for value in range(1, 10)
+                      if value != solution[row][col] and solver.is_safe(row * 9 + col, value)]
+            if values and puzzle[row][col] == 0:
+                wrong = copy_board(board)
+                wrong[row][col] = rng.choice(values)
+                count = DLXSolver(copy_board(wrong)).count_solutions(limit=COUNT_LIMIT)
+                if count == 0:
+                    unsolvable.append((wrong, 0))
+        count = DLXSolver(copy_board(board)).count_solutions(limit=COUNT_LIMIT)
+        if 1 < count < COUNT_LIMIT and len(several) < BOARDS_PER_KIND:
+            several.append((board, count))
+    return several + unsolvable
+
+
+# 16x16 boards with about half their cells blanked out: every other one also gets a wrong value that breaks no rule
+#   (usually leaving no solution), as (board, number of solutions up to COUNT_LIMIT)
+#   the full grids are a pattern grid with shuffled bands, stacks, rows, columns and digits
+def large_boards(seed=3, box_size=4):
+    rng = random.Random(seed)
+    size = box_size * box_size
+    boards = []
+    while len(boards) < LARGE_BOARDS:
+        rows = [band * box_size + row for band in rng.sample(range(box_size), box_size)
+                for row in rng.sample(range(box_size), box_size)]
+        cols = [stack * box_size + col for stack in rng.sample(range(box_size), box_size)
+                for col in rng.sample(range(box_size), box_size)]
+        digits = rng.sample(range(1, size + 1), size)
+        solution = [[digits[(box_size * (row % box_size) + row // box_size + col) % size] for col in cols]
+                    for row in rows]
+        board = copy_board(solution)
+        blanks = rng.sample(range(size * size), int(size * size * rng.uniform(0.5, 0.6)))
+        for cell in blanks:
+            board[cell // size][cell % size] = 0
+        if len(boards) % 2:
+            cell = rng.choice(blanks)
+            solver = SudokuSolver(copy_board(board))
+            values = [value for value in range(1, size + 1)
+                      if value != solution[cell // size][cell % size] and solver.is_safe(cell, value)]
+            if not values: continue
+            board[cell // size][cell % size] = rng.choice(values)
+        count = DLXSolver(copy_board(board)).count_solutions(limit=COUNT_LIMIT)
+        if count < COUNT_LIMIT:
+            boards.append((board, count))
+    return boards
+
+
+# checks that a nogood holds for board: with its assignments filled in, the board has no solution
+def is_implied(board, literals):
+    size = len(board)
+    assigned = copy_board(board)
+    for cell, value in literals:
+        assigned[cell // size][cell % size] = value
+    return DLXSolver(assigned).count_solutions(limit=1) == 0
+
+
+class NogoodSoundnessTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.boards = perturbed_boards() + large_boards()
+
+    def test_counts_match_dlx(self):
+        for options in CONFIGURATIONS:
+            for board, expected in self.boards:
+                with self.subTest(options=options, board=board):
+                    solver = SudokuSolver(copy_board(board), use_nogoods=True, **options)
+                    self.assertEqual(solver.count_solutions(limit=COUNT_LIMIT), expected)
+                    nogoods = solver.nogoods.nogoods
+                    sample = nogoods[::max(1, len(nogoods) // CHECKED_NOGOODS)]
+                    self.assertEqual([nogood.literals for nogood in sample if not is_implied(board, nogood.literals)],
+                                     [])
+
+    def test_solve_with_restarts_matches_dlx(self):
+        for strategy in ('luby', 'geometric'):
+            for board, expected in self.boards:
+                with self.subTest(restarts=strategy, board=board):
+                    solution = copy_board(board)
+                    solver = SudokuSolver(solution, use_nogoods=True, restarts=strategy, restart_base=8,
+                                          use_naked_singles=False, use_hidden_singles=False)
+                    self.assertEqual(solver.solve(), expected > 0)
+                    if expected:
+                        self.assertTrue(validate_solution(solution))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+#
+# Checks for the parallel search with work stealing (parallel.py): count_solutions_parallel must give the same counts
+#   as DLXSolver on boards with several solutions or none, with or without nogood learning
+#   the workers run tiny slices (SLICE_NODES is lowered for these tests; the worker processes are forked, so they see
+#   the lowered value) and the tree starts out split into a single task, so almost every subtree gets there by a steal
+#   a task that is searched twice or lost on the way shows up as a count that is too high or too low
+#   run with: python -m unittest discover tests (or python -m pytest tests)
+#
+
+import random
+import unittest
+from sudoku_solver import SudokuSolver, DLXSolver, parallel
+from sudoku_solver.generate import generate_puzzles
+from sudoku_solver.parallel import count_solutions_parallel, solve_parallel
+from sudoku_solver.utils import copy_board, validate_solution
+
+# counts are compared up to this many solutions (boards with more are skipped)
+COUNT_LIMIT = 40
+
+# boards with several solutions checked, and search nodes a worker runs between two checks for messages
+BOARDS = 6
+SLICE_NODES = 4
+
+# worker processes, and solver settings the counts are checked under
+WORKERS = 3
+CONFIGURATIONS = (
+    {},
+    {'use_nogoods': True},
+    {'use_nogoods': True, 'use_naked_singles': False, 'use_hidden_singles': False},
+)
+
+
+# generated hard puzzles with a few clues blanked out, as (board, number of solutions up to COUNT_LIMIT)
+def several_solutions_boards(seed=6):
+    rng = random.Random(seed)
+    sources = [puzzle for puzzle, _ in generate_puzzles(3, difficulty='hard', rng=rng)]
+    boards = []
+    while len(boards) < BOARDS:
+        board = copy_board(rng.choice(sources))
+        clues = [(row, col) for row in range(9) for col in range(9) if board[row][col]]
+        for row, col in rng.sample(clues, rng.randint(2, 4)):
+            board[row][col] = 0
+        count = DLXSolver(copy_board(board)).count_solutions(limit=COUNT_LIMIT)
+        if 1 < count < COUNT_LIMIT:
+            boards.append((board, count))
+    return boards
+
+
+# the first of boards with a blank set to a value that breaks no rule but leaves no solution
+def unsolvable_board(boards, seed=8):
+    rng = random.Random(seed)
+    board = boards[0][0]
+    while True:
+        wrong = copy_board(board)
+        row, col = rng.choice([(row, col) for row in range(9) for col in range(9) if not board[row][col]])
+        solver = SudokuSolver(copy_board(board))
+        values = [value for value in range(1, 10) if solver.is_safe(row * 9 + col, value)]
+        if not values: continue
+        wrong[row][col] = rng.choice(values)
+        if DLXSolver(copy_board(wrong)).count_solutions(limit=1) == 0:
+            return wrong
+
+
+class WorkStealingTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.boards = several_solutions_boards()
+        cls.boards.append((unsolvable_board(cls.boards), 0))
+
+    def setUp(self):
+        self.slice_nodes = parallel.SLICE_NODES
+        parallel.SLICE_NODES = SLICE_NODES
+
+    def tearDown(self):
+        parallel.SLICE_NODES = self.slice_nodes
+
+    def test_counts_match_dlx(self):
+        for options in CONFIGURATIONS:
+            for board, expected in self.boards:
+                with self.subTest(options=options, board=board):
+                    count = count_solutions_parallel(copy_board(board), workers=WORKERS, subproblems=1, **options)
+                    self.assertEqual(count, expected)
+
+    def test_counts_up_to_limit(self):
+        for options in CONFIGURATIONS:
+            for board, expected in self.boards:
+                limit = max(expected // 2, 1)
+                with self.subTest(options=options, board=board, limit=limit):
+                    count = count_solutions_parallel(copy_board(board), limit=limit, workers=WORKERS, subproblems=1,
+                                                     **options)
+                    self.assertEqual(count, min(expected, limit))
+
+    def test_solve_gives_a_solution(self):
+        for options in CONFIGURATIONS:
+            for board, expected in self.boards:
+                with self.subTest(options=options, board=board):
+                    result = solve_parallel(copy_board(board), workers=WORKERS, subproblems=1, **options)
+                    self.assertEqual(result.solution is not None, expected > 0)
+                    if expected:
+                        self.assertTrue(validate_solution(result.solution))
+                        self.assertTrue(all(value == 0 or value == result.solution[row][col]
+                                            for row, values in enumerate(board) for col, value in enumerate(values)))
+
+
+if __name__ == '__main__':
+    unittest.main()
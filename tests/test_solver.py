@@ -0,0 +1,105 @@
+#
+# Checks for SudokuSolver's search entry points on one solver used several times: counting after a solve (searched or
+#   loaded from the cache) must start over from the givens, not from the solution left on the board
+#   also runs every inference rule on both domain backends (the rules depend on what each backend's methods return),
+#   and checks that boards whose givens clash are reported unsolvable without a search
+#   incremental AC-3 must search exactly the same tree as full AC-3 (it only skips arcs that can't remove anything)
+#   run with: python -m unittest discover tests (or python -m pytest tests)
+#
+
+import random
+import unittest
+from sudoku_solver import SudokuSolver, DLXSolver, solve_many, UNSOLVABLE
+from sudoku_solver.cache import SolutionCache
+from sudoku_solver.generate import generate_puzzles
+from sudoku_solver.puzzles import get_hard_puzzle
+from sudoku_solver.utils import copy_board
+
+# counts are compared up to this many solutions
+COUNT_LIMIT = 5
+
+# every inference rule on, and each rule that is off by default on its own (with the singles off, so it does the work)
+RULE_OPTIONS = (
+    {'use_naked_pairs': True, 'use_hidden_pairs': True, 'use_locked_candidates': True},
+    {'use_naked_singles': False, 'use_hidden_singles': False, 'use_naked_pairs': True},
+    {'use_naked_singles': False, 'use_hidden_singles': False, 'use_hidden_pairs': True},
+    {'use_naked_singles': False, 'use_hidden_singles': False, 'use_locked_candidates': True},
+)
+
+
+# the bundled hard puzzle with a few clues blanked out, so it has several solutions
+def several_solutions_board():
+    board = get_hard_puzzle()
+    for row in range(3):
+        board[row] = [0] * 9
+    return board
+
+
+class SolveThenCountTest(unittest.TestCase):
+    def test_count_after_solve(self):
+        for board in ([[0] * 9 for _ in range(9)], several_solutions_board(), get_hard_puzzle()):
+            expected = DLXSolver(copy_board(board)).count_solutions(limit=COUNT_LIMIT)
+            for options in ({}, {'domain_backend': 'set'}, {'use_nogoods': True}):
+                with self.subTest(board=board, options=options):
+                    start = copy_board(board)
+                    solver = SudokuSolver(start, **options)
+                    self.assertTrue(solver.solve())
+                    self.assertEqual(solver.has_unique_solution(), expected == 1)
+                    self.assertEqual(solver.count_solutions(limit=COUNT_LIMIT), expected)
+                    self.assertEqual(start, board)
+
+    def test_count_after_cache_hit(self):
+        cache = SolutionCache()
+        board = several_solutions_board()
+        expected = DLXSolver(copy_board(board)).count_solutions(limit=COUNT_LIMIT)
+        SudokuSolver(copy_board(board), cache=cache).solve()
+        start = copy_board(board)
+        solver = SudokuSolver(start, cache=cache)
+        self.assertTrue(solver.solve())
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(solver.count_solutions(limit=COUNT_LIMIT), expected)
+        self.assertEqual(start, board)
+
+
+class InferenceRulesTest(unittest.TestCase):
+    def test_rules_on_both_backends(self):
+        for board in (several_solutions_board(), get_hard_puzzle()):
+            expected = DLXSolver(copy_board(board)).count_solutions(limit=COUNT_LIMIT)
+            for backend in ('set', 'bitmask'):
+                for options in ({},) + RULE_OPTIONS:
+                    with self.subTest(board=board, backend=backend, options=options):
+                        solver = SudokuSolver(copy_board(board), domain_backend=backend, **options)
+                        self.assertEqual(solver.count_solutions(limit=COUNT_LIMIT), expected)
+
+
+class ClashingGivensTest(unittest.TestCase):
+    def test_clashing_givens_are_unsolvable(self):
+        for row, col in ((0, 8), (8, 0), (2, 2)):  # same row, column and box as the 5 at (0, 0)
+            board = [[0] * 9 for _ in range(9)]
+            board[0][0] = board[row][col] = 5
+            with self.subTest(clash=(row, col)):
+                solver = SudokuSolver(copy_board(board), collect_stats=True)
+                self.assertFalse(solver.solve(max_seconds=5))
+                self.assertEqual(solver.status, UNSOLVABLE)
+                self.assertEqual(solver.stats.nodes, 0)
+                self.assertEqual(solver.count_solutions(), 0)
+                self.assertEqual([result.status for result in solve_many([board], engine='csp')], [UNSOLVABLE])
+
+
+class IncrementalAC3Test(unittest.TestCase):
+    def test_same_search_as_full_ac3(self):
+        puzzles = [puzzle for puzzle, _ in generate_puzzles(8, difficulty='hard', rng=random.Random(2))]
+        for options in RULE_OPTIONS[1:] + ({'use_naked_singles': False},):
+            for puzzle in puzzles:
+                with self.subTest(options=options, puzzle=puzzle):
+                    nodes = []
+                    for incremental in (True, False):
+                        solver = SudokuSolver(copy_board(puzzle), use_incremental_ac3=incremental, collect_stats=True,
+                                              **options)
+                        self.assertTrue(solver.solve())
+                        nodes.append(solver.stats.nodes)
+                    self.assertEqual(nodes[0], nodes[1])
+
+
+if __name__ == '__main__':
+    unittest.main()